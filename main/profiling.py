@@ -0,0 +1,302 @@
+import hashlib
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from rest_framework import serializers
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+logger = logging.getLogger(__name__)
+
+# upper bounds, in milliseconds, of the latency histogram buckets; the last bucket is unbounded
+BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+FIELDS = ('requests', 'total_us', 'db_us', 'serializer_us', 'render_us', 'queries', 'duplicates')
+
+current_profile = ContextVar('current_profile', default=None)
+
+
+def get_cache():
+    return caches[getattr(settings, 'PROFILING_CACHE', 'default')]
+
+
+def window_length():
+    return getattr(settings, 'PROFILING_WINDOW', 60)
+
+
+def window_count():
+    return getattr(settings, 'PROFILING_WINDOWS', 10)
+
+
+def stat_key(window, endpoint, field):
+    # endpoint names have spaces and colons, which not every cache backend accepts in keys
+    digest = hashlib.md5(endpoint.encode()).hexdigest()[:16]
+    return f'profiling:{window}:{digest}:{field}'
+
+
+def endpoints_key(window):
+    return f'profiling:{window}:endpoints'
+
+
+def query_shape(sql):
+    """The statement with IN lists of any length collapsed, so batched lookups share one shape."""
+    return re.sub(r'\((?:%s, )*%s\)', '(...)', sql)
+
+
+class Profile:
+    """Measurements of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.db = 0.0
+        self.serializer = 0.0
+        self.render = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.shapes[query_shape(sql)] += 1
+
+    @property
+    def queries(self):
+        return sum(self.shapes.values())
+
+    def duplicates(self, threshold):
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+    def server_timing(self):
+        return (f'db;dur={self.db * 1000:.3f};desc="{self.queries} queries", '
+                f'serializer;dur={self.serializer * 1000:.3f}, '
+                f'render;dur={self.render * 1000:.3f}, '
+                f'total;dur={self.total * 1000:.3f}')
+
+
+@contextmanager
+def serializing():
+    """Add the time the block takes to the serializer time of the request being profiled, if any."""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.serializer += time.perf_counter() - started
+
+
+class ProfiledSerializerMixin:
+    """
+    Counts the time `.data` takes, which views read before the response is
+    rendered, as serializer time. With `many=True` the list serializer is
+    the one whose `.data` is read, so it needs the mixin too, see
+    ProfiledListSerializer. Queries run while serializing count as DB time
+    as well.
+    """
+
+    @property
+    def data(self):
+        with serializing():
+            return super().data
+
+
+class ProfiledListSerializer(ProfiledSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+def record(endpoint, profile, duplicates):
+    cache = get_cache()
+    window = int(time.time() // window_length())
+    timeout = window_length() * (window_count() + 1)
+
+    registry = cache.get(endpoints_key(window), [])
+    if endpoint not in registry:
+        cache.set(endpoints_key(window), registry + [endpoint], timeout=timeout)
+
+    bucket = next((bound for bound in BUCKETS if profile.total * 1000 <= bound), 'inf')
+    values = {
+        'requests': 1,
+        'total_us': int(profile.total * 1e6),
+        'db_us': int(profile.db * 1e6),
+        'serializer_us': int(profile.serializer * 1e6),
+        'render_us': int(profile.render * 1e6),
+        'queries': profile.queries,
+        'duplicates': int(bool(duplicates)),
+        f'le_{bucket}': 1,
+    }
+    for field, value in values.items():
+        key = stat_key(window, endpoint, field)
+        # incr is atomic on shared backends; add only seeds the counter of a new window
+        if not cache.add(key, value, timeout=timeout):
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                cache.set(key, value, timeout=timeout)
+
+
+def collect():
+    """Per-endpoint stats summed over the retained windows."""
+    cache = get_cache()
+    current = int(time.time() // window_length())
+    windows = range(current - window_count() + 1, current + 1)
+
+    registries = cache.get_many([endpoints_key(window) for window in windows]).values()
+    names = {endpoint for registry in registries for endpoint in registry}
+
+    fields = FIELDS + tuple(f'le_{bound}' for bound in BUCKETS) + ('le_inf',)
+    keys = [(endpoint, field, stat_key(window, endpoint, field))
+            for endpoint in names for window in windows for field in fields]
+    values = cache.get_many([key for endpoint, field, key in keys])
+
+    totals = {endpoint: Counter() for endpoint in names}
+    for endpoint, field, key in keys:
+        totals[endpoint][field] += values.get(key, 0)
+    return {endpoint: summarize(counts) for endpoint, counts in totals.items() if counts['requests']}
+
+
+def summarize(counts):
+    requests = counts['requests']
+    histogram = {str(bound): counts[f'le_{bound}'] for bound in BUCKETS}
+    histogram['inf'] = counts['le_inf']
+
+    def percentile(fraction):
+        seen = 0
+        for bound in BUCKETS:
+            seen += counts[f'le_{bound}']
+            if seen >= fraction * requests:
+                return bound
+        return None
+
+    return {
+        'requests': requests,
+        'avg_ms': round(counts['total_us'] / requests / 1000, 3),
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'db_avg_ms': round(counts['db_us'] / requests / 1000, 3),
+        'serializer_avg_ms': round(counts['serializer_us'] / requests / 1000, 3),
+        'render_avg_ms': round(counts['render_us'] / requests / 1000, 3),
+        'queries_avg': round(counts['queries'] / requests, 2),
+        'duplicate_query_requests': counts['duplicates'],
+        'histogram_ms': histogram,
+    }
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a PROFILING_SAMPLE_RATE fraction of requests: query count, DB
+    time, serializer time, render time and total time. A sampled response carries them in a
+    `Server-Timing` header and they are added to rolling per-endpoint
+    histograms in the PROFILING_CACHE, which the admin-only stats view
+    reads. Statements run PROFILING_DUPLICATE_QUERIES times or more in one
+    request are logged as a likely N+1. Serializer time is what the
+    serializers built on ProfiledSerializerMixin and the `serializing()`
+    blocks take. Render time is what the handler spends rendering DRF
+    responses into bytes; other responses have none.
+
+    The histograms are counters updated with `incr`, so a cache shared by
+    the workers (memcached, redis) aggregates all of them; with the default
+    local-memory cache each process keeps its own. Put this middleware first
+    so the total time covers the others. Works under WSGI and ASGI.
+    """
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        profile = Profile()
+        token = current_profile.set(profile)
+        try:
+            with self.profiled_connections(profile):
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.finish(request, profile, response)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        profile = Profile()
+        token = current_profile.set(profile)
+        # connections are per thread, wrap the ones of the thread sync views and ORM calls run in
+        stack = await sync_to_async(self.profiled_connections)(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            current_profile.reset(token)
+        return await sync_to_async(self.finish)(request, profile, response)
+
+    def process_template_response(self, request, response):
+        # the handler renders right after the last of these hooks, which is this one as the first middleware
+        profile = current_profile.get()
+        if profile is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                profile.render += time.perf_counter() - started
+            response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def sampled():
+        return random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 0.1)
+
+    @staticmethod
+    def profiled_connections(profile):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(profile))
+        return stack
+
+    def finish(self, request, profile, response):
+        profile.total = time.perf_counter() - profile.started
+        endpoint = self.endpoint_name(request)
+        duplicates = profile.duplicates(getattr(settings, 'PROFILING_DUPLICATE_QUERIES', 3))
+        for shape, count in duplicates.items():
+            logger.warning('%s ran the same query %d times, likely N+1: %s', endpoint, count, shape)
+        record(endpoint, profile, duplicates)
+        response['Server-Timing'] = profile.server_timing()
+        return response
+
+    @staticmethod
+    def endpoint_name(request):
+        match = request.resolver_match
+        return f'{request.method} {match.view_name if match else "unresolved"}'
+
+
+class ProfilingStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        endpoints = collect()
+        return Response({
+            'sample_rate': getattr(settings, 'PROFILING_SAMPLE_RATE', 0.1),
+            'window_seconds': window_length() * window_count(),
+            'endpoints': dict(sorted(endpoints.items(), key=lambda item: -item[1]['requests'])),
+        })
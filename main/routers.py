@@ -0,0 +1,140 @@
+import hashlib
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# the alias reads of the current request go to, None for the primary
+read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_alias():
+    """The READ_REPLICA_ALIAS if it is configured in DATABASES, else None."""
+    alias = getattr(settings, 'READ_REPLICA_ALIAS', 'replica')
+    return alias if alias in connections else None
+
+
+def get_cache():
+    return caches[getattr(settings, 'READ_REPLICA_CACHE', 'default')]
+
+
+def sticky_key(client):
+    return f'db:sticky:{client}'
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads to the alias chosen by ReadReplicaMiddleware for the current
+    request and every write to the primary. Outside of requests, in
+    management commands and shells, everything goes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # without this an instance read from the replica would be saved back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReadReplicaMiddleware:
+    """
+    Routes the reads of safe-method requests to the READ_REPLICA_ALIAS
+    database. A client that made an unsafe request reads from the primary
+    for READ_REPLICA_STICKY_SECONDS afterwards, so it sees its own writes
+    whatever the replication lag. Clients are told apart by their
+    credentials, their Authorization header else their session cookie, and
+    by their address. A write pins both and a read checks both, so logging
+    in, which changes the credentials, doesn't drop a client back onto the
+    replica. Does nothing while the replica alias isn't in DATABASES.
+    Works under WSGI and ASGI.
+    """
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        alias = replica_alias()
+        if alias is None:
+            return self.get_response(request)
+
+        keys = self.sticky_keys(request)
+        safe = request.method in SAFE_METHODS
+        token = read_alias.set(alias if safe and not get_cache().get_many(keys) else None)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+
+        if not safe:
+            get_cache().set_many(dict.fromkeys(keys, True), timeout=self.sticky_seconds())
+        return response
+
+    async def __acall__(self, request):
+        alias = replica_alias()
+        if alias is None:
+            return await self.get_response(request)
+
+        keys = self.sticky_keys(request)
+        safe = request.method in SAFE_METHODS
+        token = read_alias.set(alias if safe and not await get_cache().aget_many(keys) else None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+
+        if not safe:
+            await get_cache().aset_many(dict.fromkeys(keys, True), timeout=self.sticky_seconds())
+        return response
+
+    @staticmethod
+    def sticky_seconds():
+        return getattr(settings, 'READ_REPLICA_STICKY_SECONDS', 5)
+
+    @classmethod
+    def sticky_keys(cls, request):
+        return [sticky_key(client) for client in dict.fromkeys(
+            (cls.client_key(request), cls.address_key(request)))]
+
+    @staticmethod
+    def client_key(request):
+        client = (request.META.get('HTTP_AUTHORIZATION')
+                  or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+                  or request.META.get('REMOTE_ADDR', ''))
+        return hashlib.sha1(client.encode()).hexdigest()
+
+    @staticmethod
+    def address_key(request):
+        return hashlib.sha1(request.META.get('REMOTE_ADDR', '').encode()).hexdigest()
+
+
+def replicate(target=None, source=DEFAULT_DB_ALIAS):
+    """
+    Replication stand-in for local development: copy the primary SQLite
+    database over the replica with SQLite's online backup API.
+    """
+    target = target or replica_alias()
+    if target is None:
+        raise ValueError('No replica database is configured.')
+    for alias in (source, target):
+        if connections[alias].vendor != 'sqlite':
+            raise ValueError(f'{alias} is not an SQLite database.')
+        connections[alias].ensure_connection()
+    connections[source].connection.backup(connections[target].connection)
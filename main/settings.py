@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,8 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-
-    'django_sqlprint_middleware.SqlPrintMiddleware',
+    'main.routers.ReadReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'main.urls'
@@ -91,6 +91,24 @@ DATABASES = {
     }
 }
 
+# Reads of safe requests go to DATABASES[READ_REPLICA_ALIAS] once it is added, e.g. locally
+#     'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db-replica.sqlite3'}
+# kept in sync by `manage.py replicate_sqlite --interval 1`.
+DATABASE_ROUTERS = ['main.routers.PrimaryReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -137,8 +155,61 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # rest_framework setting
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'user.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'qa.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
-    'PAGE_SIZE': 100
+    'PAGE_SIZE': 100,
+    # only views with a `throttle_scope` are limited, per user or, for anonymous requests, per address
+    'DEFAULT_THROTTLE_CLASSES': [
+        'main.throttling.SlidingWindowThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'login': '10/min',
+        'register': '10/hour',
+        'question-create': '20/min',
+        'answer-create': '30/min',
+    },
+    # trust no X-Forwarded-For, or any client could pick its own address; raise behind proxies
+    'NUM_PROXIES': 0,
 }
+
+# throttling settings
+THROTTLE_CACHE = 'default'
+
+# profiling settings
+PROFILING_CACHE = 'default'
+PROFILING_SAMPLE_RATE = 0.1
+PROFILING_WINDOW = 60
+PROFILING_WINDOWS = 10
+PROFILING_DUPLICATE_QUERIES = 3
+
+# read replica settings
+READ_REPLICA_ALIAS = 'replica'
+READ_REPLICA_STICKY_SECONDS = 5
+READ_REPLICA_CACHE = 'default'
+
+# user settings
+USER_TOKEN_CACHE = 'default'
+USER_TOKEN_CACHE_TIMEOUT = 60
+
+# qa settings
+QA_TAG_CACHE_SIZE = 4096
+QA_TAG_SIZE_CACHE_TIMEOUT = 300
+QA_TAG_FILTER_MAX_IDS = 10000
+QA_TAG_INDEX_TTL = 300
+QA_TAG_AUTOCOMPLETE_LIMIT = 10
+QA_RESPONSE_CACHE = 'default'
+QA_RESPONSE_CACHE_TIMEOUT = 300
+QA_BULK_CREATE_ATOMIC = False
+QA_BULK_CREATE_MAX_ITEMS = 1000
+QA_EXPORT_CHUNK_SIZE = 500
+QA_LIST_ANSWERS_LIMIT = 10
+QA_FAST_LISTS = False
+QA_HOT_ANSWER_WEIGHT = 1.0
+QA_HOT_ACCEPT_WEIGHT = 2.0
+QA_HOT_HALF_LIFE = 6 * 3600
+QA_HOT_MIN_SCORE = 0.01
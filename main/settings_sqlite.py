@@ -0,0 +1,30 @@
+"""
+Settings for running on a single SQLite file in production:
+DJANGO_SETTINGS_MODULE=main.settings_sqlite
+"""
+from main.settings import *  # noqa: F401,F403
+from main.settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'main.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        # one connection per worker thread, kept across requests
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                # readers don't block the writer and the writer doesn't block readers
+                'journal_mode': 'WAL',
+                # wait up to 5s for the write lock instead of failing at once
+                'busy_timeout': 5000,
+                # with WAL, fsync at checkpoints only; a crash can lose the last commits, not corrupt the file
+                'synchronous': 'NORMAL',
+                'mmap_size': 256 * 1024 * 1024,
+                # negative sizes are in KiB: 64 MiB of page cache per connection
+                'cache_size': -64 * 1024,
+            },
+        },
+    }
+}
@@ -0,0 +1,41 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+from django.db.backends.sqlite3 import base
+from django.dispatch import receiver
+
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The stock SQLite backend with two more OPTIONS: `transaction_mode`, how
+    atomic blocks BEGIN, and `pragmas`, run on every new connection by
+    `apply_pragmas`. IMMEDIATE takes the write lock when the transaction
+    starts, so concurrent writers queue on busy_timeout instead of failing
+    with "database is locked" when a read lock can't be upgraded.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('transaction_mode', None)
+        params.pop('pragmas', None)
+        return params
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode is None:
+            return super()._start_transaction_under_autocommit()
+        if mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f'transaction_mode must be one of {", ".join(TRANSACTION_MODES)}.')
+        self.cursor().execute(f'BEGIN {mode.upper()}')
+
+
+@receiver(connection_created, dispatch_uid='main.sqlite3.apply_pragmas')
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict['OPTIONS'].get('pragmas', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
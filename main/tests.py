@@ -0,0 +1,571 @@
+import os
+import tempfile
+import time
+from unittest import mock
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework import status
+from qa.models import Question, Tag, Answer
+from qa.counters import reconcile_questions, reconcile_tags
+from qa.loadtest import unthrottled
+from qa.tags import tag_index, tag_registry
+from main import settings_sqlite
+from main.profiling import ProfilingMiddleware, query_shape
+from main.routers import ReadReplicaMiddleware, read_alias, replicate
+from main.throttling import SlidingWindowThrottle
+
+
+User = get_user_model()
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1)
+class ProfilingMiddlewareTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        self.headers = {'AUTHORIZATION': f'Token {Token.objects.create(user=self.admin)}'}
+        question = Question.objects.create(owner=self.admin, title='title', description='description')
+        question.tags.set([Tag.objects.create(name='python')])
+
+    def test_server_timing(self):
+        response = self.client.get(reverse('qa:question-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertEqual(set(timing), {'db', 'serializer', 'render', 'total'})
+        self.assertIn('desc="3 queries"', timing['db'])
+        self.assertGreater(float(timing['serializer'].split('=')[1]), 0)
+        self.assertGreater(float(timing['render'].split('=')[1]), 0)
+
+        cache.clear()
+        with override_settings(QA_FAST_LISTS=True):
+            response = self.client.get(reverse('qa:question-list'))
+        timing = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertGreater(float(timing['serializer'].split('=')[1]), 0)
+
+    async def test_server_timing_async(self):
+        response = await AsyncClient().get(reverse('qa:question-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_sampling(self):
+        response = self.client.get(reverse('qa:question-list'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_stats(self):
+        for i in range(3):
+            self.client.get(reverse('qa:question-list'), {'page': i})
+        self.client.get(reverse('qa:question-detail', args=[12345]))
+
+        response = self.client.get(reverse('profiling-stats'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = response.data['endpoints']['GET qa:question-list']
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['queries_avg'], 3)
+        self.assertGreater(stats['serializer_avg_ms'], 0)
+        self.assertEqual(sum(stats['histogram_ms'].values()), 3)
+        self.assertIsNotNone(stats['p99_ms'])
+        self.assertEqual(response.data['endpoints']['GET qa:question-detail']['requests'], 1)
+
+    def test_stats_requires_admin(self):
+        response = self.client.get(reverse('profiling-stats'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_duplicate_queries(self):
+        def get_response(request):
+            for _ in range(3):
+                Question.objects.filter(pk=1).exists()
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+        with self.assertLogs('main.profiling', 'WARNING') as logs:
+            ProfilingMiddleware(get_response)(request)
+        self.assertIn('GET unresolved ran the same query 3 times', logs.output[0])
+        self.assertIn('FROM "qa_question"', logs.output[0])
+
+        response = self.client.get(reverse('profiling-stats'), headers=self.headers)
+        self.assertEqual(response.data['endpoints']['GET unresolved']['duplicate_query_requests'], 1)
+
+    def test_bulk_answers_update_questions_once(self):
+        questions = [Question.objects.create(owner=self.admin, title='title', description='description')
+                     for _ in range(3)]
+        data = [{'question': question.id, 'description': 'answer'} for question in questions]
+        with self.assertNoLogs('main.profiling', 'WARNING'), CaptureQueriesContext(connection) as captured:
+            self.client.post(reverse('qa:answer-list'), data, format='json', headers=self.headers)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "qa_question"') for query in captured), 1)
+        stats = self.client.get(reverse('profiling-stats'), headers=self.headers).data
+        self.assertEqual(stats['endpoints']['POST qa:answer-list']['duplicate_query_requests'], 0)
+
+    def test_query_shape(self):
+        self.assertEqual(query_shape('SELECT 1 WHERE id IN (%s, %s, %s)'), query_shape('SELECT 1 WHERE id IN (%s)'))
+
+
+class QueryBudgetTestCase(APITestCase):
+    """
+    Query and latency budgets of every endpoint. Each request is made on a
+    dataset of SIZES[0] items and again after growing it to SIZES[1]; the
+    query count must match the budget both times, so a query per item fails
+    the test. The latency budget is checked on the larger dataset. Budgets
+    apply to a cold request: caches are cleared first. On failure the
+    captured SQL is printed.
+    """
+    sizes = (3, 30)
+    # scales every latency budget, for slow CI machines
+    latency_scale = float(os.environ.get('LATENCY_BUDGET_SCALE', 1))
+
+    def setUp(self):
+        cache.clear()
+        tag_registry.invalidate()
+        self.password = make_password('password')
+        self.user = User.objects.create(username='owner', password=self.password)
+        self.admin = User.objects.create(username='admin', password=self.password, is_staff=True)
+        self.headers = self.auth(self.user)
+        self.admin_headers = self.auth(self.admin)
+        self.question = Question.objects.create(owner=self.user, title='django question', description='description')
+        self.answer = Answer.objects.create(question=self.question, owner=self.user, description='answer')
+        self.seeded = 0
+
+    @staticmethod
+    def auth(user):
+        return {'AUTHORIZATION': f'Token {Token.objects.create(user=user)}'}
+
+    def seed(self, size):
+        """Grow the dataset to `size` users, tags and questions, each question with tags and answers."""
+        new = range(self.seeded, size)
+        users = User.objects.bulk_create([User(username=f'user{i}', password=self.password) for i in new])
+        Tag.objects.bulk_create([Tag(name=f'tag{i}') for i in new])
+        tags = list(Tag.objects.all())
+        questions = Question.objects.bulk_create([
+            Question(owner=user, title=f'django title{i}', description='description')
+            for i, user in zip(new, users)])
+        through = Question.tags.through
+        through.objects.bulk_create([through(question=question, tag=tag)
+                                     for question in questions + [self.question] for tag in tags[-3:]],
+                                    ignore_conflicts=True)
+        Answer.objects.bulk_create([Answer(question=question, owner=user, description='answer')
+                                    for question in questions + [self.question] for user in users])
+        reconcile_questions()
+        reconcile_tags()
+        self.seeded = size
+
+    def user_with_content(self):
+        """A user who owns a question and has answered every question, as many as the dataset size."""
+        user = User.objects.create(username=f'extra{User.objects.count()}', password=self.password)
+        question = Question.objects.create(owner=user, title='title', description='description')
+        Answer.objects.bulk_create([Answer(question_id=question_id, owner=user, description='answer')
+                                    for question_id in Question.objects.values_list('pk', flat=True)])
+        return user
+
+    def assertBudget(self, queries, latency_ms, prepare):
+        """`prepare()` does the untimed setup of one request and returns a callable making it."""
+        for size in self.sizes:
+            self.seed(size)
+            send = prepare()
+            cache.clear()
+            tag_registry.invalidate()
+            tag_index.invalidate()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = send()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = (time.perf_counter() - started) * 1000
+            self.assertLess(response.status_code, 400, getattr(response, 'data', response))
+            if len(captured) != queries:
+                self.fail(f'{len(captured)} queries instead of {queries} with {size} items:\n{self.sql(captured)}')
+
+        budget = latency_ms * self.latency_scale
+        if elapsed > budget:
+            self.fail(f'{elapsed:.1f} ms, over the {budget:.0f} ms budget, with {size} items:\n{self.sql(captured)}')
+        return response
+
+    @staticmethod
+    def sql(captured):
+        return '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(captured, start=1))
+
+    def get(self, url, headers=None):
+        return lambda: lambda: self.client.get(url, headers=headers)
+
+    def send(self, method, url, data=None, headers=None):
+        return lambda: lambda: getattr(self.client, method)(url, data, format='json', headers=headers)
+
+    # QuestionViewSet
+
+    def test_question_list(self):
+        self.assertBudget(3, 100, self.get(reverse('qa:question-list')))
+
+    def test_question_list_cursor(self):
+        self.assertBudget(2, 100, self.get(reverse('qa:question-list') + '?cursor='))
+
+    def test_question_list_activity(self):
+        self.assertBudget(3, 100, self.get(reverse('qa:question-list') + '?ordering=activity'))
+
+    def test_question_list_hot(self):
+        self.assertBudget(2, 100, self.get(reverse('qa:question-list') + '?ordering=hot&cursor='))
+
+    def test_question_list_fields(self):
+        # without tags there is nothing to prefetch
+        self.assertBudget(1, 100, self.get(reverse('qa:question-list') + '?fields=id,excerpt&cursor='))
+
+    def test_question_list_include(self):
+        self.assertBudget(4, 150, self.get(reverse('qa:question-list') + '?include=answers,owner'))
+
+    def test_question_list_tags(self):
+        self.assertBudget(7, 100, self.get(reverse('qa:question-list') + '?tags=tag0,tag1'))
+
+    def test_question_retrieve(self):
+        self.assertBudget(2, 50, self.get(reverse('qa:question-detail', args=[self.question.id])))
+
+    def test_question_retrieve_include(self):
+        url = reverse('qa:question-detail', args=[self.question.id]) + '?include=answers,owner'
+        self.assertBudget(3, 50, self.get(url))
+
+    def test_question_answers(self):
+        self.assertBudget(2, 100, self.get(reverse('qa:question-answers', args=[self.question.id])))
+
+    def test_question_search(self):
+        self.assertBudget(4, 100, self.get(reverse('qa:question-search') + '?q=django'))
+
+    def test_question_export(self):
+        self.assertBudget(4, 200, self.get(reverse('qa:question-export'), self.admin_headers))
+
+    def test_question_create(self):
+        def prepare():
+            # one existing and one new tag every time
+            data = {'title': 'title', 'description': 'description', 'tags': ['tag0', f'new{self.seeded}']}
+            return lambda: self.client.post(reverse('qa:question-list'), data, format='json', headers=self.headers)
+        self.assertBudget(9, 100, prepare)
+
+    def test_question_bulk_create(self):
+        def prepare():
+            data = [{'title': f'title{i}', 'description': 'description', 'tags': ['tag0', f'new{self.seeded}-{i}']}
+                    for i in range(20)]
+            return lambda: self.client.post(reverse('qa:question-list'), data, format='json', headers=self.headers)
+        self.assertBudget(10, 200, prepare)
+
+    def test_question_update(self):
+        def prepare():
+            data = {'title': 'new', 'tags': ['tag1', f'new{self.seeded}']}
+            url = reverse('qa:question-detail', args=[self.question.id])
+            return lambda: self.client.patch(url, data, format='json', headers=self.headers)
+        self.assertBudget(15, 100, prepare)
+
+    def test_question_destroy(self):
+        def prepare():
+            question = Question.objects.create(owner=self.user, title='title', description='description')
+            question.tags.set(Tag.objects.all())
+            Answer.objects.bulk_create([Answer(question=question, owner_id=user_id, description='answer')
+                                        for user_id in User.objects.values_list('pk', flat=True)])
+            url = reverse('qa:question-detail', args=[question.id])
+            return lambda: self.client.delete(url, headers=self.headers)
+        self.assertBudget(9, 100, prepare)
+
+    # AnswerViewSet
+
+    def test_answer_list(self):
+        self.assertBudget(2, 100, self.get(reverse('qa:answer-list')))
+
+    def test_answer_retrieve(self):
+        self.assertBudget(1, 50, self.get(reverse('qa:answer-detail', args=[self.answer.id])))
+
+    def test_answer_create(self):
+        data = {'question': self.question.id, 'description': 'answer'}
+        self.assertBudget(5, 100, self.send('post', reverse('qa:answer-list'), data, self.headers))
+
+    def test_answer_bulk_create(self):
+        data = [{'question': self.question.id, 'description': f'answer{i}'} for i in range(20)]
+        self.assertBudget(7, 200, self.send('post', reverse('qa:answer-list'), data, self.headers))
+
+    def test_answer_update(self):
+        url = reverse('qa:answer-detail', args=[self.answer.id])
+        self.assertBudget(5, 100, self.send('patch', url, {'description': 'new'}, self.headers))
+
+    def test_answer_destroy(self):
+        def prepare():
+            answer = Answer.objects.create(question=self.question, owner=self.user, description='answer')
+            url = reverse('qa:answer-detail', args=[answer.id])
+            return lambda: self.client.delete(url, headers=self.headers)
+        self.assertBudget(5, 100, prepare)
+
+    def test_answer_mark_as_correct(self):
+        url = reverse('qa:answer-mark-as-correct', args=[self.answer.id])
+        self.assertBudget(5, 100, self.send('post', url, {'question': self.question.id}, self.headers))
+
+    # TagViewSet
+
+    def test_tag_list(self):
+        self.assertBudget(2, 100, self.get(reverse('qa:tag-list')))
+
+    def test_tag_autocomplete(self):
+        # loading the index, which later lookups skip
+        self.assertBudget(1, 50, self.get(reverse('qa:tag-autocomplete') + '?prefix=ta'))
+
+    # UserView, LogoutView and login
+
+    def test_user_retrieve(self):
+        self.assertBudget(1, 50, self.get(reverse('user:user'), self.headers))
+
+    def test_user_update(self):
+        self.assertBudget(2, 100, self.send('patch', reverse('user:user'), {'first_name': 'new'}, self.headers))
+
+    def test_user_create(self):
+        def prepare():
+            data = {'username': f'new{self.seeded}', 'email': 'new@example.com', 'first_name': 'first',
+                    'last_name': 'last', 'password': 'password@123456', 'password2': 'password@123456'}
+            return lambda: self.client.post(reverse('user:user'), data, format='json')
+        # password hashing dominates
+        self.assertBudget(2, 2000, prepare)
+
+    def test_user_destroy(self):
+        def prepare():
+            headers = self.auth(self.user_with_content())
+            return lambda: self.client.delete(reverse('user:user'), headers=headers)
+        self.assertBudget(16, 200, prepare)
+
+    def test_login(self):
+        data = {'username': self.user.username, 'password': 'password'}
+        self.assertBudget(2, 2000, self.send('post', reverse('user:login'), data))
+
+    def test_logout(self):
+        def prepare():
+            user = User.objects.create(username=f'logout{self.seeded}', password=self.password)
+            headers = self.auth(user)
+            return lambda: self.client.post(reverse('user:logout'), headers=headers)
+        self.assertBudget(3, 50, prepare)
+
+
+class ReadReplicaTestCase(APITransactionTestCase):
+    """
+    Runs against a second SQLite file registered as the replica, filled from
+    the primary by `replicate()`, the replication stand-in. The alias is
+    added after the test database setup, which leaves it alone.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        connections.settings['replica'] = {**connections.settings['default'],
+                                           'NAME': os.path.join(cls.replica_dir.name, 'replica.sqlite3')}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.replica_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.headers = {'AUTHORIZATION': f'Token {Token.objects.create(user=self.user)}'}
+        replicate()
+
+    def titles(self, headers=None, **extra):
+        response = self.client.get(reverse('qa:question-list'), headers=headers, **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['title'] for item in response.data['results']]
+
+    def test_reads_go_to_the_replica(self):
+        Question.objects.create(owner=self.user, title='unreplicated', description='description')
+        self.assertEqual(self.titles(), [])
+        cache.clear()
+        replicate()
+        self.assertEqual(self.titles(), ['unreplicated'])
+
+    @override_settings(READ_REPLICA_STICKY_SECONDS=60)
+    def test_writer_reads_its_writes(self):
+        data = {'title': 'mine', 'description': 'description', 'tags': ['python']}
+        response = self.client.post(reverse('qa:question-list'), data, format='json', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(Question.objects.using('replica').count(), 0)
+
+        self.assertEqual(self.titles(self.headers), ['mine'])
+        # anybody else still reads the lagging replica
+        self.assertEqual(self.titles(REMOTE_ADDR='10.0.0.2'), [])
+
+    def test_stickiness_expires(self):
+        self.client.post(reverse('qa:question-list'), {'title': 'mine', 'description': 'description', 'tags': []},
+                         format='json', headers=self.headers)
+        cache.delete_many(ReadReplicaMiddleware.sticky_keys(
+            RequestFactory().get('/', HTTP_AUTHORIZATION=self.headers['AUTHORIZATION'])))
+        self.assertEqual(self.titles(self.headers), [])
+
+    @override_settings(READ_REPLICA_STICKY_SECONDS=60)
+    def test_stickiness_survives_login(self):
+        Question.objects.create(owner=self.user, title='mine', description='description')
+        # logging in is a write under the anonymous credentials, the next reads carry a token
+        response = self.client.post(reverse('user:login'), {'username': 'user1', 'password': 'password'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles({'AUTHORIZATION': f'Token {response.data["token"]}'}), ['mine'])
+
+    @override_settings(READ_REPLICA_STICKY_SECONDS=60)
+    def test_async(self):
+        aliases = []
+
+        async def get_response(request):
+            aliases.append(read_alias.get())
+            return HttpResponse()
+
+        middleware = ReadReplicaMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        factory = RequestFactory()
+        async_to_sync(middleware)(factory.get('/'))
+        async_to_sync(middleware)(factory.post('/'))
+        async_to_sync(middleware)(factory.get('/'))
+        self.assertEqual(aliases, ['replica', None, None])
+
+    def test_writes_go_to_the_primary(self):
+        question = Question.objects.create(owner=self.user, title='title', description='description')
+        replicate()
+        replica_copy = Question.objects.using('replica').get(pk=question.pk)
+        replica_copy.title = 'changed'
+        replica_copy.save()
+        self.assertEqual(Question.objects.get(pk=question.pk).title, 'changed')
+
+
+class SqliteProfileTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        handler = ConnectionHandler({'default': {**settings_sqlite.DATABASES['default'],
+                                                 'NAME': os.path.join(directory.name, 'db.sqlite3')}})
+        self.connection = handler['default']
+        self.addCleanup(self.connection.close)
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+
+    def test_immediate_transactions(self):
+        # what transaction.atomic() runs first on an autocommit connection
+        with CaptureQueriesContext(self.connection) as captured:
+            self.connection._start_transaction_under_autocommit()
+        self.assertEqual(captured[0]['sql'], 'BEGIN IMMEDIATE')
+        self.assertTrue(self.connection.connection.in_transaction)
+        self.connection.connection.rollback()
+
+
+class ThrottlingTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.other = User.objects.create_user(username='user2', password='password')
+        self.now = 6000.0
+
+    def rates(self, **rates):
+        rates = {scope.replace('_', '-'): rate for scope, rate in rates.items()}
+        return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+    def login(self, username='user1', **extra):
+        with mock.patch.object(SlidingWindowThrottle, 'timer', lambda _: self.now):
+            return self.client.post(reverse('user:login'), {'username': username, 'password': 'wrong'}, **extra)
+
+    def create_question(self, user):
+        self.client.force_authenticate(user)
+        data = {'title': 'title', 'description': 'description', 'tags': ['python']}
+        return self.client.post(reverse('qa:question-list'), data, format='json')
+
+    def test_sliding_window(self):
+        with self.rates(login='4/min'):
+            responses = [self.login() for _ in range(5)]
+            self.assertEqual([response.status_code for response in responses[-2:]],
+                             [status.HTTP_400_BAD_REQUEST, status.HTTP_429_TOO_MANY_REQUESTS])
+            # the next request can go once the five of this window weigh no more than three
+            self.assertEqual(responses[-1]['Retry-After'], '84')
+
+            # half way into the next window the previous one counts for half
+            self.now += 90
+            self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+            response = self.login()
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(response['Retry-After'], '18')
+            self.now += 18
+            self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_per_address(self):
+        with self.rates(login='1/min'):
+            self.login()
+            self.assertEqual(self.login(HTTP_X_FORWARDED_FOR='10.0.0.9').status_code,
+                             status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(self.login('user2', REMOTE_ADDR='10.0.0.2').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_per_username(self):
+        with self.rates(login='2/min'):
+            self.login(REMOTE_ADDR='10.0.0.2')
+            self.login(REMOTE_ADDR='10.0.0.3')
+            # a third address guessing the same account
+            self.assertEqual(self.login(REMOTE_ADDR='10.0.0.4').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(self.login('user2', REMOTE_ADDR='10.0.0.4').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retry_after_full_key(self):
+        with self.rates(login='10/min'):
+            self.now = 5950.0
+            for i in range(20):
+                self.login(REMOTE_ADDR=f'10.0.1.{i}')
+            # a fresh address has room, the username waits until enough of the 20 slide out
+            self.now = 6012.0
+            response = self.login(REMOTE_ADDR='10.0.0.2')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(response['Retry-After'], '24')
+
+    def test_per_user(self):
+        with self.rates(question_create='1/min', answer_create='1/min'):
+            self.assertEqual(self.create_question(self.user).status_code, status.HTTP_201_CREATED)
+            self.assertEqual(self.create_question(self.user).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(self.create_question(self.other).status_code, status.HTTP_201_CREATED)
+            # reads and the other actions aren't limited
+            self.assertEqual(self.client.get(reverse('qa:question-list')).status_code, status.HTTP_200_OK)
+            question = Question.objects.filter(owner=self.other).get()
+            response = self.client.patch(reverse('qa:question-detail', args=[question.id]), {'title': 'new'},
+                                         format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bulk_cost(self):
+        self.client.force_authenticate(self.user)
+        data = [{'title': 'title', 'description': 'description', 'tags': ['python']}] * 3
+        with self.rates(question_create='4/min'):
+            response = self.client.post(reverse('qa:question-list'), data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            # the three items count as three requests
+            response = self.client.post(reverse('qa:question-list'), data[:2], format='json')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        with self.rates(question_create='2/min'):
+            cache.clear()
+            # an array larger than the rate takes the whole window instead of never going through
+            response = self.client.post(reverse('qa:question-list'), data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_register(self):
+        data = {'username': 'new', 'email': 'new@example.com', 'first_name': 'first', 'last_name': 'last',
+                'password': 'password@123456', 'password2': 'password@123456'}
+        with self.rates(register='1/hour'):
+            self.assertEqual(self.client.post(reverse('user:user'), data).status_code, status.HTTP_201_CREATED)
+            self.assertEqual(self.client.post(reverse('user:user'), data).status_code,
+                             status.HTTP_429_TOO_MANY_REQUESTS)
+            self.client.force_authenticate(self.user)
+            self.assertEqual(self.client.get(reverse('user:user')).status_code, status.HTTP_200_OK)
+
+    def test_unthrottled(self):
+        with self.rates(login='1/day'), unthrottled():
+            self.assertEqual({self.login().status_code for _ in range(5)}, {status.HTTP_400_BAD_REQUEST})
@@ -0,0 +1,104 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import ScopedRateThrottle
+
+
+def get_cache():
+    return caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+
+class SlidingWindowThrottle(ScopedRateThrottle):
+    """
+    Rate limits the views that set a `throttle_scope`, at the rate given for
+    that scope in DEFAULT_THROTTLE_RATES, per user, or per address for
+    anonymous requests. Views without a scope aren't touched. A view that
+    sets `throttle_username_field` is also limited per username found in
+    that field of the request data, so guessing one account's password
+    from many addresses is limited too.
+
+    DRF's own throttles keep every request time in a list that each request
+    reads and rewrites. This one keeps a counter per fixed window and
+    estimates the requests of the sliding window ending now as the current
+    count plus the previous window's, weighted by how much of it the
+    sliding window still covers. That is at most three cache operations
+    per request and key whatever the rate. The counter is bumped with
+    `incr`, atomic on shared backends, so concurrent workers can't both take
+    the last slot. Rejected requests are counted too, so a client that keeps
+    hammering stays locked out. A JSON array counts as one request per item,
+    up to the whole rate, so bulk creates can't multiply it.
+    """
+
+    @property
+    def THROTTLE_RATES(self):
+        # read on use, DRF binds the class attribute at import time
+        return api_settings.DEFAULT_THROTTLE_RATES
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+
+        self.now = self.timer()
+        window, offset = divmod(self.now, self.duration)
+        self.elapsed = offset / self.duration
+        cost = self.get_cost(request)
+        self.counts = [self.hit(key, int(window), cost) for key in self.get_cache_keys(request, view)]
+
+        if all(previous * (1 - self.elapsed) + current <= self.num_requests for current, previous in self.counts):
+            return True
+        return self.throttle_failure()
+
+    def get_cost(self, request):
+        data = request.data
+        return min(max(len(data), 1), self.num_requests) if isinstance(data, list) else 1
+
+    def get_cache_keys(self, request, view):
+        keys = [self.get_cache_key(request, view)]
+        field = getattr(view, 'throttle_username_field', None)
+        username = request.data.get(field) if field and hasattr(request.data, 'get') else None
+        if username and isinstance(username, str):
+            # usernames may hold characters cache backends don't accept in keys
+            ident = hashlib.sha1(username.encode()).hexdigest()
+            keys.append(self.cache_format % {'scope': self.scope, 'ident': f'username:{ident}'})
+        return keys
+
+    def hit(self, key, window, cost):
+        """Add `cost` to the counter of `window` under `key`, returning it and the previous window's."""
+        cache = get_cache()
+        current_key = f'{key}:{window}'
+        # the counter outlives its window by one, while it is the previous one
+        if cache.add(current_key, cost, timeout=self.duration * 2):
+            current = cost
+        else:
+            try:
+                current = cache.incr(current_key, cost)
+            except ValueError:
+                # expired between add and incr
+                cache.set(current_key, cost, timeout=self.duration * 2)
+                current = cost
+        return current, cache.get(f'{key}:{window - 1}', 0)
+
+    def wait(self):
+        """Seconds until every estimate has room for one more request."""
+        return max(self.wait_for(current, previous) for current, previous in self.counts)
+
+    def wait_for(self, current, previous):
+        if previous * (1 - self.elapsed) + current + 1 <= self.num_requests:
+            # this key has room already, only the full ones make the client wait
+            return 0
+        room = self.num_requests - current - 1
+        if previous and room >= 0:
+            # later in this window, once enough of the previous one has slid out
+            fraction = max(1 - room / previous - self.elapsed, 0)
+        else:
+            # in the next window, once enough of this one has slid out
+            fraction = 1 - self.elapsed + max(1 - (self.num_requests - 1) / current, 0)
+        # rounded so float noise doesn't push the Retry-After a second up
+        return round(fraction * self.duration, 3)
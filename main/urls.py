@@ -19,6 +19,7 @@ from django.urls import path, include
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from main.profiling import ProfilingStatsView
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -35,6 +36,7 @@ schema_view = get_schema_view(
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('profiling/', ProfilingStatsView.as_view(), name='profiling-stats'),
     path('user/', include('user.urls')),
     path('', include('qa.urls')),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class QaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'qa'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from qa import signals  # noqa: F401
+        from qa.search import ensure_triggers
+        post_migrate.connect(ensure_triggers, sender=self)
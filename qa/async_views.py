@@ -0,0 +1,190 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.authentication import get_authorization_header
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from qa.caching import LastModifiedMixin, async_cached_response, get_version
+from qa.models import Question, Answer
+from qa.pagination import KeysetPagination
+from qa.serializers import QuestionSerializer, AnswerSerializer
+from qa.views import (filter_question_list, include_fields, narrow, narrow_include, parse_fields, parse_include,
+                      parse_ordering, question_queryset)
+from user.authentication import CachedTokenAuthentication
+
+
+class AsyncReadView(LastModifiedMixin, View):
+    """
+    Read-only JSON endpoints served by async handlers, so under ASGI a request
+    waiting on the database doesn't hold a worker thread. Responses match
+    the ones of the corresponding DRF viewset actions, query parameters
+    included, and are cached and validated the same way. A query parameter
+    the endpoint doesn't support is a 400 instead of being ignored.
+    """
+    http_method_names = ['get', 'head', 'options']
+    model = None
+    serializer_class = None
+    # whether `?cursor=` switches the list to keyset pagination
+    keyset = False
+    list_params = ('fields', 'limit', 'offset')
+    detail_params = ('fields',)
+    fields = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.drf_request = Request(request)
+        try:
+            await self.authenticate(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.render({'detail': exc.detail}, exc.status_code)
+
+    async def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        authentication = CachedTokenAuthentication()
+        if not auth or auth[0].lower() != authentication.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        return await authentication.aauthenticate_credentials(key)
+
+    def parse_params(self, supported):
+        query_params = self.drf_request.query_params
+        if self.keyset and KeysetPagination.cursor_query_param in query_params:
+            supported = [*supported, KeysetPagination.cursor_query_param, KeysetPagination.count_query_param]
+        unsupported = sorted(set(query_params).difference(supported))
+        if unsupported:
+            raise exceptions.ParseError(f'Unsupported query parameters: {", ".join(unsupported)}.')
+        self.fields = parse_fields(query_params, self.get_available_fields())
+
+    def get_available_fields(self):
+        return self.serializer_class.Meta.fields
+
+    def get_queryset(self):
+        return narrow(self.model.objects.all(), self.fields)
+
+    def get_list_queryset(self):
+        return self.get_queryset()
+
+    def get_ordering(self):
+        return None
+
+    def get_serializer_context(self):
+        return {'request': self.drf_request, 'fields': self.fields}
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+
+    def serialize(self, instances, many=False):
+        return self.serializer_class(instances, many=many, context=self.get_serializer_context()).data
+
+    async def get(self, request, pk=None):
+        if pk is None:
+            self.parse_params(self.list_params)
+            return await self.list(request)
+        self.parse_params(self.detail_params)
+        return await self.retrieve(request, pk)
+
+    @async_cached_response
+    async def list(self, request):
+        # may query, to resolve `?tags=`
+        queryset = await sync_to_async(self.get_list_queryset)()
+        if self.keyset and KeysetPagination.cursor_query_param in self.drf_request.query_params:
+            paginator = KeysetPagination()
+            page = await paginator.apaginate_queryset(queryset, self.drf_request, view=self)
+        else:
+            paginator = LimitOffsetPagination()
+            paginator.request = self.drf_request
+            paginator.limit = paginator.get_limit(self.drf_request)
+            paginator.offset = paginator.get_offset(self.drf_request)
+            paginator.count = await queryset.acount()
+            page = []
+            if paginator.count and paginator.offset <= paginator.count:
+                # iterating a queryset runs its prefetches too
+                page = [obj async for obj in queryset[paginator.offset:paginator.offset + paginator.limit]]
+        self.note_modified(page)
+        return paginator.get_paginated_response(self.serialize(page, many=True)).data
+
+    @async_cached_response
+    async def retrieve(self, request, pk):
+        try:
+            instance = await self.get_queryset().aget(pk=pk)
+        except (self.model.DoesNotExist, ValueError):
+            raise exceptions.NotFound(f'No {self.model._meta.object_name} matches the given query.')
+        self.note_modified([instance])
+        return self.serialize(instance)
+
+
+class AsyncQuestionView(AsyncReadView):
+    model = Question
+    serializer_class = QuestionSerializer
+    keyset = True
+    list_params = ('fields', 'include', 'limit', 'offset', 'ordering', 'tags')
+    detail_params = ('fields', 'include')
+    include = frozenset()
+
+    def parse_params(self, supported):
+        # before the fields, which may name the included relations
+        self.include = parse_include(self.drf_request.query_params) if 'include' in supported else set()
+        super().parse_params(supported)
+        self.include = narrow_include(self.include, self.fields)
+
+    def get_available_fields(self):
+        return include_fields(super().get_available_fields(), self.include)
+
+    def get_queryset(self):
+        return question_queryset(self.fields, self.include)
+
+    def get_list_queryset(self):
+        queryset = question_queryset(self.fields, self.include, getattr(settings, 'QA_LIST_ANSWERS_LIMIT', 10))
+        return filter_question_list(queryset, self.drf_request.query_params)
+
+    def get_ordering(self):
+        return parse_ordering(self.drf_request.query_params)
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'include': self.include}
+
+    def get_cache_version(self):
+        users = ('users',) if 'owner' in self.include else ()
+        if 'pk' in self.kwargs:
+            return get_version('tags', f'question:{self.kwargs["pk"]}', *users)
+        return get_version('list', *users)
+
+    def note_modified(self, objects):
+        super().note_modified(objects)
+        if 'answers' in self.include:
+            for question in objects:
+                super().note_modified(question.answer_set.all())
+
+
+class AsyncQuestionAnswersView(AsyncReadView):
+    model = Answer
+    serializer_class = AnswerSerializer
+    keyset = True
+
+    def get_list_queryset(self):
+        return self.get_queryset().filter(question=self.kwargs['pk'])
+
+    def get_cache_version(self):
+        return get_version('tags', f'question:{self.kwargs["pk"]}')
+
+    async def get(self, request, pk=None):
+        self.parse_params(self.list_params)
+        return await self.list(request)
+
+
+class AsyncAnswerView(AsyncReadView):
+    model = Answer
+    serializer_class = AnswerSerializer
+
+    def get_cache_version(self):
+        if 'pk' in self.kwargs:
+            return get_version('accepted', f'answer:{self.kwargs["pk"]}')
+        return get_version('list')
@@ -0,0 +1,181 @@
+import time
+from functools import wraps
+from hashlib import md5
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+from main.routers import read_alias
+
+
+def get_cache():
+    return caches[getattr(settings, 'QA_RESPONSE_CACHE', 'default')]
+
+
+def version_key(name):
+    return f'qa:version:{name}'
+
+
+def get_version(*names):
+    """
+    Return a token combining the current version of every name. A version that
+    was evicted comes back as a fresh timestamp, never as a reused number.
+    """
+    cache = get_cache()
+    keys = [version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = cache.get_or_set(key, time.time_ns, timeout=None)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def _bump(names):
+    cache = get_cache()
+    for name in names:
+        try:
+            cache.incr(version_key(name))
+        except ValueError:
+            cache.set(version_key(name), time.time_ns(), timeout=None)
+
+
+def bump_version(*names):
+    # bumping again on commit drops anything a concurrent reader cached from
+    # the pre-commit state under the first bump
+    _bump(names)
+    transaction.on_commit(lambda: _bump(names))
+
+
+def response_key(version, renderer_format, uri):
+    # responses read from a replica are cached apart from those read from the primary
+    parts = [version, read_alias.get() or '', renderer_format or '', uri]
+    return 'qa:response:' + md5(':'.join(parts).encode()).hexdigest()
+
+
+def response_etag(key):
+    return f'"{key.rsplit(":", 1)[1]}"'
+
+
+def response_timeout():
+    timeout = getattr(settings, 'QA_RESPONSE_CACHE_TIMEOUT', 300)
+    if read_alias.get() is not None:
+        timeout = min(timeout, getattr(settings, 'READ_REPLICA_STICKY_SECONDS', 5))
+    return timeout
+
+
+def is_not_modified(request, etag, entry):
+    """Whether the conditional headers of `request` match the cached `entry` or its `etag`."""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return etag in parse_etags(if_none_match)
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return entry is not None and entry[1] is not None and since is not None and int(entry[1].timestamp()) <= since
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def cached_response(method):
+    """
+    Serve a read action from the response cache, keyed by the view's
+    `get_cache_version()`, and answer conditional GETs with 304 before
+    anything is queried or serialized.
+
+    Responses read from a replica are cached apart from those read from the
+    primary, so a client sticking to the primary never gets replica data,
+    and only for READ_REPLICA_STICKY_SECONDS, the lag the replica is allowed.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = response_key(self.get_cache_version(), request.accepted_renderer.format, request.build_absolute_uri())
+        etag = response_etag(key)
+        entry = cache.get(key)
+
+        if is_not_modified(request, etag, entry):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            last_modified = entry[1] if entry is not None else None
+        elif entry is not None:
+            response = Response(entry[0])
+            last_modified = entry[1]
+        else:
+            self.last_modified = None
+            response = method(self, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            last_modified = self.last_modified
+            cache.set(key, (response.data, last_modified), timeout=response_timeout())
+        return set_validators(response, etag, last_modified)
+    return wrapper
+
+
+def async_cached_response(method):
+    """
+    cached_response for the async views of qa.async_views, whose read
+    methods return the data to render rather than a response.
+    """
+    @wraps(method)
+    async def wrapper(self, request, *args, **kwargs):
+        cache = get_cache()
+        version = await sync_to_async(self.get_cache_version)()
+        key = response_key(version, 'json', request.build_absolute_uri())
+        etag = response_etag(key)
+        entry = await cache.aget(key)
+
+        if is_not_modified(request, etag, entry):
+            return set_validators(HttpResponseNotModified(), etag, entry[1] if entry is not None else None)
+        if entry is None:
+            self.last_modified = None
+            entry = (await method(self, request, *args, **kwargs), self.last_modified)
+            await cache.aset(key, entry, timeout=response_timeout())
+        return set_validators(self.render(entry[0]), etag, entry[1])
+    return wrapper
+
+
+class LastModifiedMixin:
+    """
+    Tracks the newest `published_date` among the objects a read returns,
+    for the Last-Modified header of the cached responses.
+    """
+    last_modified = None
+
+    def note_modified(self, objects):
+        # objects are model instances, or .values() rows on the fast path
+        dates = [date for date in (obj.get('published_date') if isinstance(obj, dict)
+                                   else getattr(obj, 'published_date', None) for obj in objects) if date]
+        if dates:
+            self.last_modified = max([self.last_modified, *dates] if self.last_modified else dates)
+
+
+class CachedReadMixin(LastModifiedMixin):
+    """
+    Keys the `cached_response` actions of a DRF view on the versions of its
+    `cache_scopes`, and notes the objects they return for Last-Modified.
+    Views whose responses depend on other versions per action override
+    `get_cache_version()`.
+    """
+    # names bumped by bump_version() whenever a cached response may change
+    cache_scopes = ('list',)
+
+    def get_cache_version(self):
+        return get_version(*self.cache_scopes)
+
+    def get_object(self):
+        obj = super().get_object()
+        self.note_modified([obj])
+        return obj
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.note_modified(page)
+        return page
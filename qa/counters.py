@@ -0,0 +1,186 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import (Case, Count, DateTimeField, Exists, F, FloatField, IntegerField, Max, OuterRef, Q,
+                              Subquery, Value, When)
+from django.db.models.functions import Coalesce, Greatest
+
+from qa.caching import bump_version
+from qa.models import Question, Answer, Tag
+from qa.ranking import accept_weight, answer_weight
+
+
+def by_question(values, output_field):
+    """`values[question_id]` for the question of the row being updated, as one expression."""
+    if len(values) == 1:
+        return Value(next(iter(values.values())), output_field=output_field)
+    return Case(*(When(pk=question_id, then=Value(value)) for question_id, value in values.items()),
+                output_field=output_field)
+
+
+def answers_added(answers):
+    """Count freshly created `answers` on their questions and bump their activity, in one UPDATE."""
+    added = Counter(answer.question_id for answer in answers)
+    if not added:
+        return
+    latest = {}
+    for answer in answers:
+        latest[answer.question_id] = max(latest.get(answer.question_id, answer.published_date), answer.published_date)
+    Question.objects.filter(pk__in=added).update(
+        answer_count=F('answer_count') + by_question(added, IntegerField()),
+        last_activity_at=Greatest(F('last_activity_at'), by_question(latest, DateTimeField())),
+        hot_score=F('hot_score') + by_question({question_id: count * answer_weight()
+                                                for question_id, count in added.items()}, FloatField()),
+    )
+
+
+def answer_changed(answer):
+    Question.objects.filter(pk=answer.question_id).update(
+        last_activity_at=Greatest(F('last_activity_at'), Value(answer.published_date)),
+    )
+
+
+def answer_removed(answer):
+    Question.objects.filter(pk=answer.question_id).update(
+        answer_count=Greatest(F('answer_count') - 1, Value(0)),
+    )
+
+
+def owner_answers_removed(owner_id):
+    """
+    Uncount, in one UPDATE, the answers of a user about to be deleted on the
+    questions that outlive the user. Their own questions go away anyway.
+    """
+    answers = Answer.objects.filter(question=OuterRef('pk'), owner_id=owner_id).order_by()
+    Question.objects.filter(Exists(answers)).exclude(owner_id=owner_id).update(
+        answer_count=Greatest(
+            F('answer_count') - Subquery(answers.values('question').annotate(count=Count('id')).values('count')),
+            Value(0)),
+    )
+
+
+def shift_tag_counts(deltas):
+    """Add `deltas[tag_id]` to the question_count of each tag in one UPDATE."""
+    by_delta = defaultdict(list)
+    for tag_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(tag_id)
+    if not by_delta:
+        return
+    if len(by_delta) == 1:
+        delta = Value(next(iter(by_delta)))
+    else:
+        delta = Case(*(When(pk__in=tag_ids, then=Value(delta)) for delta, tag_ids in by_delta.items()),
+                     output_field=IntegerField())
+    Tag.objects.filter(pk__in=[tag_id for tag_ids in by_delta.values() for tag_id in tag_ids]).update(
+        question_count=Greatest(F('question_count') + delta, Value(0)))
+
+
+def tags_added(tag_ids):
+    """Count one more question on every tag of `tag_ids`, repeated ids counting once per occurrence."""
+    shift_tag_counts(Counter(tag_ids))
+
+
+def tags_removed(tag_ids):
+    shift_tag_counts({tag_id: -count for tag_id, count in Counter(tag_ids).items()})
+
+
+def question_tags_removed(question_id):
+    Tag.objects.filter(question=question_id).update(question_count=Greatest(F('question_count') - 1, Value(0)))
+
+
+def owner_questions_removed(owner_id):
+    """Uncount, in one UPDATE, the questions of a user about to be deleted from their tags."""
+    links = Question.tags.through.objects.filter(tag=OuterRef('pk'), question__owner_id=owner_id).order_by()
+    Tag.objects.filter(Exists(links)).update(
+        question_count=Greatest(
+            F('question_count') - Subquery(links.values('tag').annotate(count=Count('id')).values('count')),
+            Value(0)),
+    )
+
+
+def accept_answer(question_id, answer_id, owner_id, when):
+    """
+    Make `answer_id` the only accepted answer of `question_id`, provided the
+    question belongs to `owner_id` and the answer belongs to the question.
+    The conditional UPDATE of the question row comes first, so concurrent
+    calls for the same question are serialized on it. Returns False, having
+    changed nothing, when a condition doesn't hold.
+    """
+    with transaction.atomic():
+        updated = Question.objects.filter(
+            Exists(Answer.objects.filter(pk=answer_id, question=OuterRef('pk'))),
+            pk=question_id, owner_id=owner_id,
+        ).update(
+            accepted_answer=answer_id,
+            last_activity_at=Greatest(F('last_activity_at'), Value(when)),
+            # re-accepting the same answer doesn't heat the question up again
+            hot_score=Case(When(accepted_answer=answer_id, then=F('hot_score')),
+                           default=F('hot_score') + accept_weight()),
+        )
+        if not updated:
+            return False
+        Answer.objects.filter(Q(is_correct=True) | Q(pk=answer_id), question_id=question_id).update(
+            is_correct=Case(When(pk=answer_id, then=Value(True)), default=Value(False)),
+        )
+        bump_version('list', 'accepted', f'question:{question_id}')
+    return True
+
+
+def question_stats():
+    """Expressions recomputing the denormalized answer columns of a question."""
+    answers = Answer.objects.filter(question=OuterRef('pk')).order_by()
+    return {
+        'answer_count': Coalesce(
+            Subquery(answers.values('question').annotate(count=Count('id')).values('count')),
+            Value(0), output_field=IntegerField()),
+        'accepted_answer': Subquery(answers.filter(is_correct=True).order_by('-published_date', '-id').values('id')[:1]),
+        'last_activity_at': Coalesce(
+            Subquery(answers.values('question').annotate(latest=Max('published_date')).values('latest')),
+            F('created_date')),
+    }
+
+
+def reconcile_questions(batch_size=1000, stdout=None):
+    """
+    Recompute the denormalized answer columns, `batch_size` questions at a
+    time. Only the questions that drifted are updated, and the cached
+    responses showing them dropped.
+    """
+    columns = ('answer_count', 'accepted_answer_id', 'last_activity_at')
+    last_id = 0
+    total = 0
+    while True:
+        actual = {f'actual_{name}': expression for name, expression in question_stats().items()}
+        rows = list(Question.objects.filter(pk__gt=last_id).order_by('pk').annotate(**actual)
+                    .values_list('pk', *columns, *actual)[:batch_size])
+        if not rows:
+            break
+        drifted = [row[0] for row in rows if row[1:len(columns) + 1] != row[len(columns) + 1:]]
+        if drifted:
+            Question.objects.filter(pk__in=drifted).update(**question_stats())
+            bump_version('list', *(f'question:{pk}' for pk in drifted))
+        total += len(rows)
+        last_id = rows[-1][0]
+        if stdout is not None:
+            stdout.write(f'reconciled {total} questions')
+    return total
+
+
+def reconcile_tags(batch_size=1000, stdout=None):
+    """Recompute the question_count of every tag, `batch_size` tags per UPDATE."""
+    links = Question.tags.through.objects.filter(tag=OuterRef('pk')).order_by()
+    count = Coalesce(Subquery(links.values('tag').annotate(count=Count('id')).values('count')),
+                     Value(0), output_field=IntegerField())
+    last_id = 0
+    total = 0
+    while True:
+        ids = list(Tag.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        total += Tag.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]).update(question_count=count)
+        last_id = ids[-1]
+        if stdout is not None:
+            stdout.write(f'reconciled {total} tags')
+    bump_version('tags')
+    return total
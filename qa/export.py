@@ -0,0 +1,77 @@
+import zlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from qa.models import Question, Answer
+
+
+def parse_since(value):
+    """Parse a `since` datetime or date, returning None when it's invalid."""
+    try:
+        # both raise ValueError for well-formed but impossible values, like 2020-02-30
+        since = parse_datetime(value)
+        if since is None:
+            date = parse_date(value)
+            if date is None:
+                return None
+            since = datetime(date.year, date.month, date.day)
+    except ValueError:
+        return None
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, dt_timezone.utc)
+    return since
+
+
+def export_questions(since=None, chunk_size=500):
+    """
+    Yield one NDJSON line per question with its tags and answers. Questions
+    are read `chunk_size` at a time with their relations prefetched per chunk,
+    so memory use doesn't grow with the size of the table.
+    """
+    queryset = Question.objects.prefetch_related(
+        'tags',
+        Prefetch('answer_set', queryset=Answer.objects.order_by('id')),
+    ).order_by('id')
+    if since is not None:
+        queryset = queryset.filter(published_date__gte=since)
+
+    encoder = DjangoJSONEncoder()
+    for question in queryset.iterator(chunk_size=chunk_size):
+        yield encoder.encode({
+            'id': question.id,
+            'owner': question.owner_id,
+            'title': question.title,
+            'description': question.description,
+            'tags': [tag.name for tag in question.tags.all()],
+            'is_closed': question.is_closed,
+            'created_date': question.created_date,
+            'published_date': question.published_date,
+            'answers': [{
+                'id': answer.id,
+                'owner': answer.owner_id,
+                'description': answer.description,
+                'is_correct': answer.is_correct,
+                'created_date': answer.created_date,
+                'published_date': answer.published_date,
+            } for answer in question.answer_set.all()],
+        }) + '\n'
+
+
+def gzip_stream(lines, flush_every=64 * 1024):
+    """Gzip an iterable of str, emitting a block whenever `flush_every` bytes are buffered."""
+    compressor = zlib.compressobj(wbits=31)
+    pending = 0
+    for line in lines:
+        data = line.encode()
+        pending += len(data)
+        block = compressor.compress(data)
+        if pending >= flush_every:
+            block += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if block:
+            yield block
+    yield compressor.flush()
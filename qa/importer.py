@@ -0,0 +1,236 @@
+import json
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from qa.caching import bump_version
+from qa.counters import reconcile_questions, reconcile_tags
+from qa.models import Question, Answer, Tag
+from qa.search import rebuild_index
+
+
+User = get_user_model()
+
+USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'password', 'is_active', 'date_joined')
+QUESTION_FIELDS = ('id', 'owner', 'title', 'description', 'is_closed', 'created_date', 'published_date')
+ANSWER_FIELDS = ('id', 'question', 'owner', 'description', 'is_correct', 'created_date', 'published_date')
+DATE_FIELDS = ('created_date', 'published_date', 'date_joined')
+# keys a record of each type must have; ids are kept so re-importing a chunk is harmless
+REQUIRED_FIELDS = {
+    'user': ('id', 'username'),
+    'tag': ('name',),
+    'question': ('id', 'owner', 'title', 'description'),
+    'answer': ('id', 'question', 'owner', 'description'),
+}
+
+
+@contextmanager
+def preserve_dates(*models):
+    """Let bulk_create keep the dates from the dump instead of auto_now(_add)."""
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def secondary_index_sql():
+    """CREATE statements of the non-unique indexes and triggers on the Q&A tables (SQLite only)."""
+    tables = [Question._meta.db_table, Answer._meta.db_table, Question.tags.through._meta.db_table]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') "
+            f"AND sql IS NOT NULL AND tbl_name IN ({', '.join(['%s'] * len(tables))})", tables)
+        return [(kind, name, sql) for kind, name, sql in cursor.fetchall()
+                if kind == 'trigger' or not sql.upper().startswith('CREATE UNIQUE')]
+
+
+def drop_secondary_indexes():
+    dropped = secondary_index_sql()
+    with connection.cursor() as cursor:
+        for kind, name, sql in dropped:
+            cursor.execute(f'DROP {kind.upper()} IF EXISTS "{name}"')
+    return dropped
+
+
+def restore_secondary_indexes(dropped):
+    with connection.cursor() as cursor:
+        for kind, name, sql in dropped:
+            cursor.execute(sql.replace(f'CREATE {kind.upper()} ', f'CREATE {kind.upper()} IF NOT EXISTS ', 1))
+    if any(kind == 'trigger' for kind, name, sql in dropped):
+        rebuild_index()
+
+
+class QAImporter:
+    """
+    Loads a JSONL dump of users, tags, questions and answers. Every line is
+    an object with a `type` key; parents must come before their children.
+    Ids from the dump are kept, so every chunk is inserted with
+    `ignore_conflicts` and re-importing a chunk after a crash is harmless.
+    A checkpoint file records the byte offset of the last committed chunk.
+    Every record of a chunk is checked before it is inserted, a malformed
+    one is a ValueError naming its line and the chunk isn't committed.
+    """
+
+    def __init__(self, path, chunk_size=5000, checkpoint=None, drop_indexes=False, stdout=None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.checkpoint = checkpoint
+        self.drop_indexes = drop_indexes
+        self.stdout = stdout
+        self.counts = {'user': 0, 'tag': 0, 'question': 0, 'answer': 0}
+        self.tag_ids = {}
+
+    def run(self, resume=False):
+        state = self.load_checkpoint() if resume else {}
+        if state.get('done'):
+            return 0, 0.0
+        offset = state.get('offset', 0)
+        line_number = state.get('line', 0)
+        self.counts.update(state.get('counts', {}))
+        dropped = [tuple(item) for item in state.get('dropped', [])]
+        if self.drop_indexes and not dropped and connection.vendor == 'sqlite':
+            dropped = drop_secondary_indexes()
+
+        self.tag_ids = dict(Tag.objects.values_list('name', 'id'))
+        started = time.monotonic()
+        imported = 0
+        with open(self.path, 'rb') as dump, preserve_dates(User, Question, Answer):
+            dump.seek(offset)
+            while True:
+                records = []
+                for line in dump:
+                    line_number += 1
+                    if line.strip():
+                        records.append(self.parse(line, line_number))
+                    if len(records) >= self.chunk_size:
+                        break
+                if not records:
+                    break
+
+                with transaction.atomic():
+                    self.import_chunk(records)
+                imported += len(records)
+                self.save_checkpoint({'offset': dump.tell(), 'line': line_number, 'counts': self.counts,
+                                      'dropped': dropped})
+                self.report(imported, started)
+
+        if dropped:
+            restore_secondary_indexes(dropped)
+        self.reset_sequences()
+        reconcile_questions()
+        reconcile_tags()
+        bump_version('list', 'tags')
+        self.save_checkpoint(None)
+        return imported, time.monotonic() - started
+
+    @staticmethod
+    def parse(line, line_number):
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            raise ValueError(f'Line {line_number}: invalid JSON: {exc}')
+        if not isinstance(record, dict):
+            raise ValueError(f'Line {line_number}: expected an object, got {type(record).__name__}')
+        kind = record.get('type')
+        if kind not in REQUIRED_FIELDS:
+            raise ValueError(f'Line {line_number}: unknown record type: {kind!r}')
+        missing = [field for field in REQUIRED_FIELDS[kind] if record.get(field) is None]
+        if missing:
+            raise ValueError(f'Line {line_number}: {kind} record without {", ".join(missing)}')
+        return record
+
+    def import_chunk(self, records):
+        grouped = {'user': [], 'tag': [], 'question': [], 'answer': []}
+        for record in records:
+            kind = record.pop('type', None)
+            if kind not in grouped:
+                raise ValueError(f'Unknown record type: {kind!r}')
+            grouped[kind].append(record)
+
+        if grouped['user']:
+            users = []
+            for record in grouped['user']:
+                record.setdefault('password', make_password(None))
+                users.append(User(**self.pick(record, USER_FIELDS)))
+            User.objects.bulk_create(users, ignore_conflicts=True)
+
+        names = [record['name'] for record in grouped['tag']]
+        names += [name for record in grouped['question'] for name in record.get('tags', [])]
+        self.resolve_tags(names)
+
+        if grouped['question']:
+            Question.objects.bulk_create([Question(**self.pick(record, QUESTION_FIELDS))
+                                          for record in grouped['question']], ignore_conflicts=True)
+            through = Question.tags.through
+            through.objects.bulk_create([
+                through(question_id=record['id'], tag_id=self.tag_ids[name])
+                for record in grouped['question'] for name in dict.fromkeys(record.get('tags', []))
+            ], ignore_conflicts=True)
+
+        if grouped['answer']:
+            Answer.objects.bulk_create([Answer(**self.pick(record, ANSWER_FIELDS))
+                                        for record in grouped['answer']], ignore_conflicts=True)
+
+        for kind, items in grouped.items():
+            self.counts[kind] += len(items)
+
+    def resolve_tags(self, names):
+        new_names = [name for name in dict.fromkeys(names) if name not in self.tag_ids]
+        if new_names:
+            Tag.objects.bulk_create([Tag(name=name) for name in new_names], ignore_conflicts=True)
+            self.tag_ids.update(Tag.objects.filter(name__in=new_names).values_list('name', 'id'))
+
+    @staticmethod
+    def pick(record, fields):
+        values = {}
+        for field in fields:
+            if field not in record:
+                if field in DATE_FIELDS:
+                    values[field] = timezone.now()
+                continue
+            value = record[field]
+            if field in DATE_FIELDS and isinstance(value, str):
+                value = parse_datetime(value)
+            values[f'{field}_id' if field in ('owner', 'question') else field] = value
+        return values
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(no_style(), [User, Tag, Question, Answer])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def load_checkpoint(self):
+        if not self.checkpoint:
+            return {}
+        try:
+            with open(self.checkpoint) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def save_checkpoint(self, state):
+        if not self.checkpoint:
+            return
+        if state is None:
+            state = {'offset': 0, 'counts': self.counts, 'done': True}
+        with open(self.checkpoint, 'w') as file:
+            json.dump(state, file)
+
+    def report(self, imported, started):
+        if self.stdout is not None:
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'{imported} rows, {imported / elapsed if elapsed else 0:.0f} rows/sec')
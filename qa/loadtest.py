@@ -0,0 +1,258 @@
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient
+
+from qa.models import Question, Answer, Tag
+from user.authentication import forget_token
+
+
+User = get_user_model()
+
+PASSWORD = 'load-test-password'
+
+
+def unthrottled():
+    """
+    Raise every configured rate out of reach, so load tests measure the
+    views, throttling overhead included, instead of 429s.
+    """
+    rates = dict.fromkeys(api_settings.DEFAULT_THROTTLE_RATES, f'{sys.maxsize}/s')
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+class LoadDriver:
+    """
+    Drives every route of the qa and user apps in process with the test
+    client and records, per endpoint, the latency of each request and the
+    number of SQL queries it ran. Requests run one after the other, so
+    requests/sec is the single-worker throughput of the endpoint.
+
+    Everything runs in one transaction that is rolled back at the end, unless
+    `keep_writes` is set, so the driver can be pointed at a seeded database
+    without leaving load-test users and questions behind.
+    """
+
+    def __init__(self, requests=100, endpoints=None, sample=1000, keep_writes=False, seed=0, stdout=None):
+        self.requests = requests
+        self.only = endpoints
+        self.sample = sample
+        self.keep_writes = keep_writes
+        self.random = random.Random(seed)
+        self.stdout = stdout
+        self.tokens = []
+
+    def run(self):
+        started = time.monotonic()
+        # responses are cached for no time, so every request is measured cold
+        with unthrottled(), override_settings(QA_RESPONSE_CACHE_TIMEOUT=0), transaction.atomic():
+            self.setup()
+            results = {}
+            for name, prepare in self.endpoints():
+                if self.only and name not in self.only:
+                    continue
+                results[name] = self.measure(prepare)
+                if self.stdout is not None:
+                    self.stdout.write(f'{name}: {results[name]["p50_ms"]} ms p50')
+            if not self.keep_writes:
+                transaction.set_rollback(True)
+        if not self.keep_writes:
+            # the rows are gone, don't let the token cache outlive them
+            for key in self.tokens:
+                forget_token(key)
+
+        return {
+            'meta': {
+                'database': connection.vendor,
+                'questions': self.counts['questions'],
+                'answers': self.counts['answers'],
+                'requests_per_endpoint': self.requests,
+                'seconds': round(time.monotonic() - started, 3),
+            },
+            'endpoints': results,
+        }
+
+    def setup(self):
+        self.counts = {'questions': Question.objects.count(), 'answers': Answer.objects.count()}
+        password = make_password(PASSWORD)
+        suffix = self.random.getrandbits(32)
+        self.user = User.objects.create(username=f'load_user_{suffix}', password=password)
+        self.admin = User.objects.create(username=f'load_admin_{suffix}', password=password,
+                                         is_staff=True, is_superuser=True)
+        self.username = self.user.username
+        self.password = password
+
+        self.client = self.authenticated(self.user)
+        self.admin_client = self.authenticated(self.admin)
+        self.anonymous = APIClient()
+
+        # a question of the load-test user, for updates and mark_as_correct
+        self.question = Question.objects.create(owner=self.user, title='load test', description='load test')
+        self.answers = [Answer.objects.create(question=self.question, owner=self.user, description='load test')
+                        for _ in range(2)]
+        self.question_ids = self.sample_ids(Question) or [self.question.pk]
+        self.answer_ids = self.sample_ids(Answer) or [answer.pk for answer in self.answers]
+        self.tag = Tag.objects.order_by('-pk').values_list('name', flat=True).first() or 'python'
+
+    def sample_ids(self, model):
+        """Up to `sample` existing ids, drawn uniformly from the id range without scanning the table."""
+        bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return []
+        candidates = {self.random.randint(bounds['low'], bounds['high']) for _ in range(self.sample)}
+        return list(model.objects.filter(pk__in=candidates).values_list('pk', flat=True))
+
+    def authenticated(self, user):
+        token = Token.objects.create(user=user)
+        self.tokens.append(token.key)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def throwaway_user(self, i):
+        return User.objects.create(username=f'{self.username}_{i}', password=self.password)
+
+    def measure(self, prepare):
+        latencies = []
+        queries = []
+        errors = 0
+        for i in range(self.requests):
+            send = prepare(i)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = send()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                latencies.append(time.perf_counter() - started)
+            queries.append(len(captured))
+            errors += response.status_code >= 400
+        return self.summary(latencies, queries, errors)
+
+    @staticmethod
+    def summary(latencies, queries, errors):
+        milliseconds = [latency * 1000 for latency in latencies]
+        if len(milliseconds) > 1:
+            cuts = statistics.quantiles(milliseconds, n=100, method='inclusive')
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = milliseconds[0]
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'p50_ms': round(p50, 3),
+            'p95_ms': round(p95, 3),
+            'p99_ms': round(p99, 3),
+            'requests_per_second': round(len(latencies) / sum(latencies), 1),
+            'queries_avg': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+        }
+
+    def endpoints(self):
+        """(name, prepare) pairs; prepare(i) does untimed setup and returns the request to time."""
+        pick = self.random.choice
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+
+        def get(client, path):
+            return lambda i: lambda: client.get(path)
+
+        def detail(name, ids, query=''):
+            def prepare(i):
+                url = reverse(f'qa:{name}', args=[pick(ids)]) + query
+                return lambda: self.anonymous.get(url)
+            return prepare
+
+        def create_question(i):
+            data = {'title': f'load test {i}', 'description': 'load test', 'tags': [self.tag, f'load-{i % 10}']}
+            return lambda: self.client.post(reverse('qa:question-list'), data, format='json')
+
+        def update_question(i):
+            url = reverse('qa:question-detail', args=[self.question.pk])
+            return lambda: self.client.patch(url, {'title': f'load test {i}'}, format='json')
+
+        def destroy_question(i):
+            question = Question.objects.create(owner=self.user, title='load test', description='load test')
+            return lambda: self.client.delete(reverse('qa:question-detail', args=[question.pk]))
+
+        def create_answer(i):
+            data = {'question': pick(self.question_ids), 'description': f'load test {i}'}
+            return lambda: self.client.post(reverse('qa:answer-list'), data, format='json')
+
+        def update_answer(i):
+            url = reverse('qa:answer-detail', args=[self.answers[0].pk])
+            return lambda: self.client.patch(url, {'description': f'load test {i}'}, format='json')
+
+        def destroy_answer(i):
+            answer = Answer.objects.create(question=self.question, owner=self.user, description='load test')
+            return lambda: self.client.delete(reverse('qa:answer-detail', args=[answer.pk]))
+
+        def mark_as_correct(i):
+            url = reverse('qa:answer-mark-as-correct', args=[self.answers[i % 2].pk])
+            return lambda: self.client.post(url, {'question': self.question.pk}, format='json')
+
+        def update_user(i):
+            return lambda: self.client.patch(reverse('user:user'), {'first_name': f'load {i}'}, format='json')
+
+        def create_user(i):
+            data = {'username': f'{self.username}_new_{i}', 'email': f'load{i}@example.com', 'first_name': 'load',
+                    'last_name': 'test', 'password': 'Load-test-password-1', 'password2': 'Load-test-password-1'}
+            return lambda: self.anonymous.post(reverse('user:user'), data, format='json')
+
+        def destroy_user(i):
+            client = self.authenticated(self.throwaway_user(i))
+            return lambda: client.delete(reverse('user:user'))
+
+        def login(i):
+            return lambda: self.anonymous.post(reverse('user:login'),
+                                               {'username': self.username, 'password': PASSWORD}, format='json')
+
+        def logout(i):
+            client = self.authenticated(self.throwaway_user(f'logout_{i}'))
+            return lambda: client.post(reverse('user:logout'))
+
+        return [
+            ('question-list', get(self.anonymous, reverse('qa:question-list'))),
+            ('question-list-cursor', get(self.anonymous, reverse('qa:question-list') + '?cursor=')),
+            ('question-list-hot', get(self.anonymous, reverse('qa:question-list') + '?ordering=hot&cursor=')),
+            ('question-list-activity', get(self.anonymous, reverse('qa:question-list') + '?ordering=activity')),
+            ('question-list-tags', get(self.anonymous, reverse('qa:question-list') + f'?tags={self.tag}')),
+            ('question-detail', detail('question-detail', self.question_ids)),
+            ('question-detail-include', detail('question-detail', self.question_ids, '?include=answers,owner')),
+            ('question-answers', detail('question-answers', self.question_ids)),
+            ('question-search', get(self.anonymous, reverse('qa:question-search') + '?q=django')),
+            ('question-export', get(self.admin_client, reverse('qa:question-export') + f'?since={since}')),
+            ('question-create', create_question),
+            ('question-update', update_question),
+            ('question-destroy', destroy_question),
+            ('answer-list', get(self.anonymous, reverse('qa:answer-list'))),
+            ('answer-detail', detail('answer-detail', self.answer_ids)),
+            ('answer-create', create_answer),
+            ('answer-update', update_answer),
+            ('answer-destroy', destroy_answer),
+            ('answer-mark-as-correct', mark_as_correct),
+            ('tag-list', get(self.anonymous, reverse('qa:tag-list'))),
+            ('tag-autocomplete', get(self.anonymous, reverse('qa:tag-autocomplete') + f'?prefix={self.tag[:2]}')),
+            ('async-question-list', get(self.anonymous, reverse('qa:async-question-list'))),
+            ('async-question-detail', detail('async-question-detail', self.question_ids)),
+            ('async-question-answers', detail('async-question-answers', self.question_ids)),
+            ('async-answer-list', get(self.anonymous, reverse('qa:async-answer-list'))),
+            ('async-answer-detail', detail('async-answer-detail', self.answer_ids)),
+            ('user-detail', get(self.client, reverse('user:user'))),
+            ('user-update', update_user),
+            ('user-create', create_user),
+            ('user-destroy', destroy_user),
+            ('login', login),
+            ('logout', logout),
+        ]
@@ -0,0 +1,62 @@
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from qa.models import Tag
+from qa.tags import TagIndex
+
+
+class Command(BaseCommand):
+    help = ('Time tag autocomplete lookups from the in-process prefix index against the equivalent '
+            'LIKE query, for prefixes of 1 to 4 characters of existing tag names.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lookups', type=int, default=2000)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help='Index this many generated names instead of the tags in the database; '
+                                 'skips the query comparison.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        index = TagIndex()
+        started = time.perf_counter()
+        if options['synthetic']:
+            alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789-'
+            index.load((''.join(rnd.choices(alphabet, k=rnd.randint(2, 20))), int(rnd.paretovariate(1)))
+                       for _ in range(options['synthetic']))
+        else:
+            index.entries()
+        load_ms = (time.perf_counter() - started) * 1000
+        names = [name for _, name, _ in index.entries()]
+        if not names:
+            self.stderr.write('No tags to look up.')
+            return
+
+        prefixes = [name[:rnd.randint(1, 4)] for name in rnd.choices(names, k=options['lookups'])]
+        limit = options['limit']
+        results = {
+            'tags': len(names),
+            'load_ms': round(load_ms, 3),
+            'index': self.measure(prefixes, lambda prefix: index.complete(prefix, limit)),
+        }
+        if not options['synthetic']:
+            results['query'] = self.measure(prefixes[:200], lambda prefix: list(
+                Tag.objects.filter(name__istartswith=prefix).order_by('-question_count', 'name')
+                .values_list('name', 'question_count')[:limit]))
+        self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def measure(prefixes, lookup):
+        timings = []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            lookup(prefix)
+            timings.append((time.perf_counter() - started) * 1e6)
+        cuts = statistics.quantiles(timings, n=100, method='inclusive')
+        return {'lookups': len(timings), 'p50_us': round(cuts[49], 1), 'p95_us': round(cuts[94], 1),
+                'p99_us': round(cuts[98], 1), 'max_us': round(max(timings), 1)}
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+
+
+class Command(BaseCommand):
+    help = ('Compare read throughput of the sync (WSGI) DRF endpoints with the async (ASGI) ones, '
+            'in process, against the configured database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--path', default='question/', help='Path below / and /async/ to request.')
+
+    def handle(self, *args, **options):
+        total, concurrency, path = options['requests'], options['concurrency'], options['path']
+        results = {
+            'wsgi': self.run_sync(f'/{path}', total, concurrency),
+            'asgi': self.run_async(f'/async/{path}', total, concurrency),
+        }
+        self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def url(path, i):
+        # a unique query string per request keeps the response cache out of the measurement
+        return f'{path}{"&" if "?" in path else "?"}bench={i}'
+
+    def run_sync(self, path, total, concurrency):
+        def worker(indexes):
+            client = Client()
+            try:
+                return [client.get(self.url(path, i)).status_code for i in indexes]
+            finally:
+                connections.close_all()
+
+        chunks = [range(start, total, concurrency) for start in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            statuses = [code for codes in executor.map(worker, chunks) for code in codes]
+        return self.summary(statuses, time.perf_counter() - started)
+
+    def run_async(self, path, total, concurrency):
+        async def main():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def fetch(i):
+                async with semaphore:
+                    return (await client.get(self.url(path, i))).status_code
+
+            return await asyncio.gather(*(fetch(i) for i in range(total)))
+
+        started = time.perf_counter()
+        statuses = asyncio.run(main())
+        return self.summary(statuses, time.perf_counter() - started)
+
+    @staticmethod
+    def summary(statuses, elapsed):
+        return {
+            'requests': len(statuses),
+            'errors': sum(code >= 400 for code in statuses),
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(len(statuses) / elapsed, 1),
+        }
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from main import settings_sqlite
+from qa.models import Tag
+
+
+class Command(BaseCommand):
+    help = ('Measure concurrent write and read throughput on a scratch SQLite file, with the stock '
+            'backend and per-request connections, then with the main.settings_sqlite profile.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def handle(self, *args, **options):
+        tuned = settings_sqlite.DATABASES['default']
+        profiles = {
+            'stock': {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 0},
+            'tuned': {key: tuned[key] for key in ('ENGINE', 'CONN_MAX_AGE', 'OPTIONS')},
+        }
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, config in profiles.items():
+                alias = f'benchmark_{name}'
+                connections.settings[alias] = {**connections.settings['default'], **config,
+                                               'NAME': os.path.join(directory, f'{name}.sqlite3')}
+                try:
+                    results[name] = self.run(alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections[alias]
+                    del connections.settings[alias]
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run(self, alias, options):
+        with connections[alias].schema_editor() as editor:
+            editor.create_model(Tag)
+        Tag.objects.using(alias).bulk_create([Tag(name=uuid4().hex) for _ in range(1000)])
+        # without persistent connections every request opens and closes its own
+        per_request = connections.settings[alias]['CONN_MAX_AGE'] == 0
+
+        counts = {'writes': 0, 'reads': 0, 'write_errors': 0, 'read_errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+
+        def write():
+            # read-then-write, the shape of most of our write requests
+            with transaction.atomic(using=alias):
+                Tag.objects.using(alias).filter(name__startswith='a').exists()
+                # bulk_create sends no signals, which would reach for the default database
+                Tag.objects.using(alias).bulk_create([Tag(name=uuid4().hex)])
+
+        def read():
+            list(Tag.objects.using(alias).order_by('-id')[:20])
+
+        def worker(operation, kind):
+            done = errors = 0
+            while time.monotonic() < deadline:
+                try:
+                    operation()
+                    done += 1
+                except OperationalError:
+                    errors += 1
+                if per_request:
+                    connections[alias].close()
+            connections[alias].close()
+            with lock:
+                counts[kind] += done
+                counts[f'{kind[:-1]}_errors'] += errors
+
+        threads = [threading.Thread(target=worker, args=(write, 'writes')) for _ in range(options['writers'])]
+        threads += [threading.Thread(target=worker, args=(read, 'reads')) for _ in range(options['readers'])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        return {
+            'writes_per_second': round(counts['writes'] / elapsed, 1),
+            'reads_per_second': round(counts['reads'] / elapsed, 1),
+            'write_errors': counts['write_errors'],
+            'read_errors': counts['read_errors'],
+        }
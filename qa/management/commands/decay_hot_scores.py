@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from qa.ranking import decay_hot_scores
+
+
+class Command(BaseCommand):
+    help = 'Decay the hot score of every question. Schedule it to run every --interval seconds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=3600, help='Seconds since the previous run.')
+
+    def handle(self, *args, **options):
+        updated = decay_hot_scores(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Decayed the hot score of {updated} questions.'))
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from qa.export import export_questions, gzip_stream, parse_since
+
+
+class Command(BaseCommand):
+    help = 'Export questions with their tags and answers as NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='File to write to, stdout by default.')
+        parser.add_argument('--since', help='Only export questions published at or after this date.')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output.')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_since(options['since'])
+            if since is None:
+                raise CommandError(f'Invalid --since value: {options["since"]}')
+
+        lines = export_questions(since=since, chunk_size=options['chunk_size'])
+        if options['gzip']:
+            stream = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+            chunks = gzip_stream(lines)
+        else:
+            stream = open(options['output'], 'w') if options['output'] else self.stdout
+            chunks = lines
+
+        try:
+            for chunk in chunks:
+                stream.write(chunk)
+        finally:
+            if options['output']:
+                stream.close()
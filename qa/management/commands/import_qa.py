@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from qa.importer import QAImporter
+
+
+class Command(BaseCommand):
+    help = 'Bulk import users, tags, questions and answers from a JSONL dump.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSONL file, one {"type": "user|tag|question|answer", ...} object per line.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Records per transaction.')
+        parser.add_argument('--checkpoint', help='File recording progress, defaults to <path>.checkpoint.')
+        parser.add_argument('--resume', action='store_true', help='Continue from the last committed chunk.')
+        parser.add_argument('--drop-indexes', action='store_true',
+                            help='Drop secondary indexes and search triggers during the import and rebuild them after.')
+
+    def handle(self, *args, **options):
+        importer = QAImporter(
+            options['path'],
+            chunk_size=options['chunk_size'],
+            checkpoint=options['checkpoint'] or f'{options["path"]}.checkpoint',
+            drop_indexes=options['drop_indexes'],
+            stdout=self.stdout,
+        )
+        try:
+            imported, elapsed = importer.run(resume=options['resume'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        rate = imported / elapsed if elapsed else 0
+        counts = ', '.join(f'{count} {kind}s' for kind, count in importer.counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} rows in {elapsed:.1f}s ({rate:.0f} rows/sec): {counts}.'))
@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from qa.loadtest import LoadDriver
+
+
+class Command(BaseCommand):
+    help = ('Request every qa and user endpoint in process and report p50/p95/p99 latency, '
+            'requests/sec and SQL queries per endpoint as JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Requests per endpoint.')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Only run this endpoint; may be given more than once.')
+        parser.add_argument('--sample', type=int, default=1000, help='Number of question/answer ids to sample.')
+        parser.add_argument('--keep-writes', action='store_true',
+                            help='Commit the rows written by the run instead of rolling them back.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report to this file.')
+
+    def handle(self, *args, **options):
+        driver = LoadDriver(requests=options['requests'], endpoints=options['endpoints'],
+                            sample=options['sample'], keep_writes=options['keep_writes'],
+                            seed=options['seed'], stdout=self.stderr)
+        report = json.dumps(driver.run(), indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
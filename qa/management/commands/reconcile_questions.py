@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from qa.counters import reconcile_questions
+
+
+class Command(BaseCommand):
+    help = 'Recompute answer_count, accepted_answer and last_activity_at of every question.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = reconcile_questions(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {total} questions.'))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.routers import replicate
+
+
+class Command(BaseCommand):
+    help = ('Copy the primary SQLite database over the read replica, standing in for replication '
+            'when both are local SQLite files.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep replicating every this many seconds instead of once.')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                replicate()
+            except ValueError as e:
+                raise CommandError(e)
+            self.stdout.write(f'Replicated at {time.strftime("%H:%M:%S")}.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
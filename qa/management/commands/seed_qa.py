@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from qa.seed import Seeder
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic, Zipf-distributed Q&A dataset for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--questions', type=int, default=1000)
+        parser.add_argument('--answers', type=float, default=3.0, help='Mean number of answers per question.')
+        parser.add_argument('--days', type=int, default=365, help='Spread creation dates over this many days.')
+        parser.add_argument('--exponent', type=float, default=1.1, help='Zipf exponent.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible datasets.')
+
+    def handle(self, *args, **options):
+        seeder = Seeder(
+            users=options['users'], tags=options['tags'], questions=options['questions'],
+            answers=options['answers'], days=options['days'], exponent=options['exponent'],
+            batch_size=options['batch_size'], seed=options['seed'], stdout=self.stdout,
+        )
+        elapsed = seeder.run()
+        rows = sum(seeder.counts.values())
+        counts = ', '.join(f'{count} {kind}' for kind, count in seeder.counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {counts} in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/sec).'))
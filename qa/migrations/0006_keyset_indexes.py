@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-18 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa', '0005_alter_tag_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', '-created_date', '-id'], name='answer_question_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-created_date', '-id'], name='question_created_id_idx'),
+        ),
+    ]
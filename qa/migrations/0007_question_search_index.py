@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE qa_question_fts USING fts5("
+    "title, description, content='qa_question', content_rowid='id')",
+    "CREATE TRIGGER qa_question_fts_ai AFTER INSERT ON qa_question BEGIN "
+    "INSERT INTO qa_question_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+    "CREATE TRIGGER qa_question_fts_ad AFTER DELETE ON qa_question BEGIN "
+    "INSERT INTO qa_question_fts(qa_question_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "END",
+    "CREATE TRIGGER qa_question_fts_au AFTER UPDATE OF title, description ON qa_question BEGIN "
+    "INSERT INTO qa_question_fts(qa_question_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO qa_question_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS qa_question_fts_au",
+    "DROP TRIGGER IF EXISTS qa_question_fts_ad",
+    "DROP TRIGGER IF EXISTS qa_question_fts_ai",
+    "DROP TABLE IF EXISTS qa_question_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+    schema_editor.execute("INSERT INTO qa_question_fts(qa_question_fts) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2 on 2026-10-18 13:04
+
+from django.db import migrations, models
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def fill_answer_stats(apps, schema_editor):
+    Question = apps.get_model('qa', 'Question')
+    Answer = apps.get_model('qa', 'Answer')
+    answers = Answer.objects.filter(question=OuterRef('pk')).order_by()
+    Question.objects.update(
+        answer_count=Coalesce(
+            Subquery(answers.values('question').annotate(count=Count('id')).values('count')),
+            Value(0), output_field=IntegerField()),
+        accepted_answer=Subquery(answers.filter(is_correct=True).order_by('-published_date', '-id').values('id')[:1]),
+        last_activity_at=Coalesce(
+            Subquery(answers.values('question').annotate(latest=Max('published_date')).values('latest')),
+            F('created_date')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa', '0007_question_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='accepted_answer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='qa.answer'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='answer_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(fill_answer_stats, migrations.RunPython.noop),
+    ]
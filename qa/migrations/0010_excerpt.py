@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-18 13:33
+
+from django.db import migrations, models
+
+
+def make_excerpt(text, length=200):
+    # a copy of qa.models.make_excerpt as of this migration, which must not change with the model code
+    text = ' '.join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1]
+    space = cut.rfind(' ')
+    if space > length // 2:
+        cut = cut[:space]
+    return cut.rstrip() + '\u2026'
+
+
+def fill_excerpts(apps, schema_editor):
+    for name in ('Question', 'Answer'):
+        model = apps.get_model('qa', name)
+        batch = []
+        for obj in model.objects.only('description').iterator(chunk_size=2000):
+            obj.excerpt = make_excerpt(obj.description)
+            batch.append(obj)
+            if len(batch) == 2000:
+                model.objects.bulk_update(batch, ['excerpt'])
+                batch = []
+        model.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa', '0009_question_ranking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
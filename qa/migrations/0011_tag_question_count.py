@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-18 13:41
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_question_counts(apps, schema_editor):
+    Tag = apps.get_model('qa', 'Tag')
+    Question = apps.get_model('qa', 'Question')
+    links = Question.tags.through.objects.filter(tag=OuterRef('pk')).order_by()
+    Tag.objects.update(question_count=Coalesce(
+        Subquery(links.values('tag').annotate(count=Count('id')).values('count')),
+        Value(0), output_field=IntegerField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa', '0010_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-question_count', 'name'], name='tag_count_name_idx'),
+        ),
+        migrations.RunPython(fill_question_counts, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,63 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+
+EXCERPT_LENGTH = 200
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """The start of `text` with whitespace collapsed, cut at a word boundary to at most `length` characters."""
+    text = ' '.join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1]
+    space = cut.rfind(' ')
+    if space > length // 2:
+        cut = cut[:space]
+    return cut.rstrip() + '\u2026'
+
+
+class ExcerptQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create doesn't call save(), fill the excerpts here instead
+        objs = list(objs)
+        for obj in objs:
+            obj.excerpt = make_excerpt(obj.description)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class ExcerptModel(models.Model):
+    """A model with a `description` and a short plain `excerpt` of it kept up to date on save."""
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default='', editable=False)
+
+    objects = ExcerptQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.excerpt = make_excerpt(self.description)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'description' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
 
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
+    question_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-question_count', 'name'], name='tag_count_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Question(models.Model):
+class Question(ExcerptModel):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     title = models.CharField(max_length=2000)
     description = models.TextField()
@@ -17,9 +65,20 @@ class Question(models.Model):
     published_date = models.DateTimeField(auto_now=True)
     tags = models.ManyToManyField(Tag)
     is_closed = models.BooleanField(default=False)
+    answer_count = models.PositiveIntegerField(default=0)
+    accepted_answer = models.ForeignKey('Answer', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    hot_score = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_date', '-id'], name='question_created_id_idx'),
+            models.Index(fields=['-last_activity_at', '-id'], name='question_activity_id_idx'),
+            models.Index(fields=['-hot_score', '-id'], name='question_hot_id_idx'),
+        ]
 
 
-class Answer(models.Model):
+class Answer(ExcerptModel):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     description = models.TextField()
@@ -27,4 +86,7 @@ class Answer(models.Model):
     created_date = models.DateTimeField(auto_now_add=True)
     published_date = models.DateTimeField(auto_now=True)
 
-
+    class Meta:
+        indexes = [
+            models.Index(fields=['question', '-created_date', '-id'], name='answer_question_created_id_idx'),
+        ]
@@ -0,0 +1,143 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique ordering. The cursor holds the ordering
+    values of the last row on the page, so every page is an index range scan
+    instead of an OFFSET scan. The total count is only computed on request.
+
+    http://api.example.org/question/?cursor=
+    http://api.example.org/question/?cursor=WyIyMDI0LTA1LTE0IiwgMTJd&count=true
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering = ('-created_date', '-id')
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.prepare(request, queryset, view)
+        if self.count_requested(request):
+            self.count = queryset.count()
+        return self.set_page(list(self.page_queryset(queryset)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views."""
+        self.prepare(request, queryset, view)
+        if self.count_requested(request):
+            self.count = await queryset.acount()
+        return self.set_page([obj async for obj in self.page_queryset(queryset)])
+
+    def prepare(self, request, queryset, view):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.position = self.decode_cursor(request, queryset.model, self.ordering)
+        self.count = None
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param) in ('1', 'true')
+
+    def page_queryset(self, queryset):
+        queryset = queryset.order_by(*self.ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.after(self.ordering, self.position))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'get_ordering', lambda: None)() or self.ordering
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param],
+                                 strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    @staticmethod
+    def after(ordering, position):
+        # (a, b) < (x, y)  <=>  a < x OR (a = x AND b < y)
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def decode_cursor(self, request, model, ordering):
+        """The position in the cursor, each value converted by its ordering field, so a tampered cursor is a 404."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+        except (BinasciiError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [model._meta.get_field(field.lstrip('-')).to_python(value)
+                    for field, value in zip(ordering, position)]
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance):
+        names = [field.lstrip('-') for field in self.ordering]
+        if isinstance(instance, dict):
+            position = [str(instance[name]) for name in names]
+        else:
+            position = [str(getattr(instance, name)) for name in names]
+        return urlsafe_b64encode(json.dumps(position).encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {
+                    'type': 'integer',
+                    'example': 123,
+                },
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                    'example': 'http://api.example.org/question/?{cursor_param}=WyIyMDI0LTA1LTE0IiwgMTJd'.format(
+                        cursor_param=self.cursor_query_param),
+                },
+                'results': schema,
+            },
+        }
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db.models import Case, F, Value, When
+
+from qa.caching import bump_version
+from qa.models import Question
+
+
+# ?ordering= modes of the question list, each an index range scan over a stored column
+ORDERINGS = {
+    'newest': ('-created_date', '-id'),
+    'activity': ('-last_activity_at', '-id'),
+    'hot': ('-hot_score', '-id'),
+}
+
+
+def answer_weight():
+    return getattr(settings, 'QA_HOT_ANSWER_WEIGHT', 1.0)
+
+
+def accept_weight():
+    return getattr(settings, 'QA_HOT_ACCEPT_WEIGHT', 2.0)
+
+
+def decay_factor(interval):
+    """How much of a hot score is left `interval` seconds later."""
+    return 0.5 ** (interval / getattr(settings, 'QA_HOT_HALF_LIFE', 6 * 3600))
+
+
+def decay_hot_scores(interval):
+    """
+    Decay every hot score by `interval` seconds worth of half-life. Meant to
+    be run every `interval` seconds. Scores that fall under QA_HOT_MIN_SCORE
+    are zeroed, so only questions with recent activity are rewritten.
+    """
+    factor = decay_factor(interval)
+    floor = getattr(settings, 'QA_HOT_MIN_SCORE', 0.01)
+    updated = Question.objects.filter(hot_score__gt=0).update(
+        hot_score=Case(When(hot_score__lt=floor / factor, then=Value(0.0)), default=F('hot_score') * factor),
+    )
+    bump_version('list')
+    return updated
@@ -0,0 +1,114 @@
+import re
+
+from django.db import connection, connections
+
+from qa.models import Question
+
+
+FTS_TABLE = 'qa_question_fts'
+
+# SQLite drops triggers along with their table, and migrations that alter
+# qa_question rebuild it, so these are re-created after every migrate
+TRIGGERS = {
+    f'{FTS_TABLE}_ai': (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON qa_question BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); "
+        f"END"),
+    f'{FTS_TABLE}_ad': (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON qa_question BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+        f"VALUES ('delete', old.id, old.title, old.description); "
+        f"END"),
+    f'{FTS_TABLE}_au': (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON qa_question BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+        f"VALUES ('delete', old.id, old.title, old.description); "
+        f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); "
+        f"END"),
+}
+
+
+def match_expression(text):
+    # quote every word so user input can't inject fts5 query syntax
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', text))
+
+
+def ensure_triggers(using='default', **kwargs):
+    """Re-create missing index triggers, reindexing since changes went unseen."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        if cursor.fetchone() is None:
+            return
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'qa_question'")
+        missing = set(TRIGGERS) - {row[0] for row in cursor.fetchall()}
+        if not missing:
+            return
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def rebuild_index(batch_size=1000, stdout=None):
+    """Reindex every question, `batch_size` rows per statement."""
+    last_id = 0
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        while True:
+            cursor.execute(
+                f"SELECT id, title, description FROM qa_question WHERE id > %s ORDER BY id LIMIT %s",
+                [last_id, batch_size])
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (%s, %s, %s)", rows)
+            last_id = rows[-1][0]
+            total += len(rows)
+            if stdout is not None:
+                stdout.write(f'indexed {total} questions')
+    return total
+
+
+class QuestionSearch:
+    """
+    A sliceable, countable sequence of questions matching `text`, ranked by
+    bm25, so it can be handed to the regular paginators.
+    """
+
+    def __init__(self, text, queryset=None):
+        self.expression = match_expression(text)
+        self.queryset = Question.objects.all() if queryset is None else queryset
+
+    def count(self):
+        if not self.expression:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [self.expression])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        if not self.expression:
+            return []
+
+        offset = item.start or 0
+        limit = -1 if item.stop is None else max(item.stop - offset, 0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}) LIMIT %s OFFSET %s",
+                [self.expression, limit, offset])
+            ids = [row[0] for row in cursor.fetchall()]
+
+        questions = self.queryset.in_bulk(ids)
+        return [questions[pk] for pk in ids if pk in questions]
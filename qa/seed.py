@@ -0,0 +1,142 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from qa.caching import bump_version
+from qa.counters import reconcile_questions, reconcile_tags
+from qa.importer import preserve_dates
+from qa.models import Question, Answer, Tag
+
+
+User = get_user_model()
+
+WORDS = ('python django query index cache async thread lock table page token join count serializer model '
+         'view router migration field signal request response latency error string list dict loop import '
+         'class function test deploy server client database sqlite postgres redis json http header').split()
+
+
+def zipf_weights(n, exponent):
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+class Seeder:
+    """
+    Generates a synthetic Q&A dataset with bulk_create. Question authorship,
+    answer authorship, tag usage and answers per question all follow Zipf
+    distributions, so a few users and tags account for most of the rows as
+    on a real forum. Every seeded user has the password `password`.
+    """
+
+    def __init__(self, users=100, tags=50, questions=1000, answers=3.0, days=365, exponent=1.1,
+                 batch_size=5000, seed=0, stdout=None):
+        self.users = users
+        self.tags = tags
+        self.questions = questions
+        self.answers = answers
+        self.days = days
+        self.exponent = exponent
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.stdout = stdout
+        self.counts = {'users': 0, 'tags': 0, 'questions': 0, 'answers': 0}
+
+    def run(self):
+        started = time.monotonic()
+        now = timezone.now()
+        with preserve_dates(User, Question, Answer):
+            user_ids = self.create_users(now)
+            tag_ids = self.create_tags()
+            user_weights = zipf_weights(len(user_ids), self.exponent)
+            tag_weights = zipf_weights(len(tag_ids), self.exponent)
+            # answers per question: zipf over 0..cap, rescaled towards the requested mean
+            cap = max(int(self.answers * 4), 1)
+            count_weights = zipf_weights(cap + 1, self.exponent)
+            mean = sum(k / (k + 1) ** self.exponent for k in range(cap + 1)) / count_weights[-1]
+            scale = self.answers / mean if mean else 0
+
+            for start in range(0, self.questions, self.batch_size):
+                size = min(self.batch_size, self.questions - start)
+                with transaction.atomic():
+                    self.create_batch(size, now, user_ids, user_weights, tag_ids, tag_weights, cap,
+                                      count_weights, scale)
+                self.report(started)
+
+        reconcile_questions(batch_size=self.batch_size)
+        reconcile_tags(batch_size=self.batch_size)
+        bump_version('list', 'tags')
+        return time.monotonic() - started
+
+    def create_users(self, now):
+        password = make_password('password')
+        offset = User.objects.filter(username__startswith='seed_user_').count()
+        user_ids = []
+        for start in range(offset, offset + self.users, self.batch_size):
+            users = User.objects.bulk_create([
+                User(username=f'seed_user_{i}', email=f'seed_user_{i}@example.com', password=password,
+                     first_name='Seed', last_name=str(i), date_joined=now - timedelta(days=self.days))
+                for i in range(start, min(start + self.batch_size, offset + self.users))
+            ])
+            user_ids += [user.pk for user in users]
+        self.counts['users'] = len(user_ids)
+        return user_ids
+
+    def create_tags(self):
+        Tag.objects.bulk_create([Tag(name=f'seed-tag-{i}') for i in range(self.tags)], ignore_conflicts=True)
+        tag_ids = list(Tag.objects.filter(name__startswith='seed-tag-').order_by('pk').values_list('pk', flat=True))
+        self.counts['tags'] = len(tag_ids)
+        return tag_ids
+
+    def sentence(self, words):
+        return ' '.join(self.random.choices(WORDS, k=words))
+
+    def create_batch(self, size, now, user_ids, user_weights, tag_ids, tag_weights, cap, count_weights, scale):
+        rnd = self.random
+        span = self.days * 86400
+        questions = []
+        for _ in range(size):
+            created = now - timedelta(seconds=rnd.random() * span)
+            questions.append(Question(
+                owner_id=rnd.choices(user_ids, cum_weights=user_weights)[0],
+                title=self.sentence(rnd.randint(4, 12)),
+                description=self.sentence(rnd.randint(20, 120)),
+                created_date=created, published_date=created, last_activity_at=created,
+            ))
+        Question.objects.bulk_create(questions)
+
+        through = Question.tags.through
+        through.objects.bulk_create([
+            through(question_id=question.pk, tag_id=tag_id)
+            for question in questions
+            for tag_id in set(rnd.choices(tag_ids, cum_weights=tag_weights, k=rnd.randint(1, 5)))
+        ])
+
+        answers = []
+        for question in questions:
+            count = round(rnd.choices(range(cap + 1), cum_weights=count_weights)[0] * scale)
+            accepted = rnd.randrange(count) if count and rnd.random() < 0.3 else None
+            for index in range(count):
+                created = question.created_date + (now - question.created_date) * rnd.random()
+                answers.append(Answer(
+                    question_id=question.pk,
+                    owner_id=rnd.choices(user_ids, cum_weights=user_weights)[0],
+                    description=self.sentence(rnd.randint(10, 80)),
+                    is_correct=index == accepted,
+                    created_date=created, published_date=created,
+                ))
+        Answer.objects.bulk_create(answers, batch_size=self.batch_size)
+
+        self.counts['questions'] += len(questions)
+        self.counts['answers'] += len(answers)
+
+    def report(self, started):
+        if self.stdout is not None:
+            rows = sum(self.counts.values())
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'{self.counts["questions"]}/{self.questions} questions, '
+                              f'{rows / elapsed if elapsed else 0:.0f} rows/sec')
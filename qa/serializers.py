@@ -1,16 +1,138 @@
+from collections.abc import Mapping
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
-from qa.models import Question, Tag, Answer
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from main.profiling import ProfiledListSerializer, ProfiledSerializerMixin
+from qa.models import Question, Answer, Tag
+from qa.tags import set_question_tags, bulk_set_question_tags
+from qa.caching import bump_version
+from qa.counters import answers_added
+
+
+class BatchPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    A PrimaryKeyRelatedField that, while `batch` is set, looks each pk up
+    once per batch instead of once per item.
+    """
+    batch = None
+
+    def to_internal_value(self, data):
+        if self.batch is None or isinstance(data, bool):
+            return super().to_internal_value(data)
+        key = str(data)
+        if key not in self.batch:
+            self.batch[key] = super().to_internal_value(data)
+        return self.batch[key]
+
+
+class BulkListSerializer(ProfiledListSerializer):
+    """
+    Validates a list of items, resolving related pks for the whole list with
+    one query per field, and saves the valid items through the child's
+    `bulk_create()` in one transaction. Unless `context['atomic']` is set,
+    invalid items are reported in `item_errors` instead of failing the list.
+    """
+
+    def to_internal_value(self, data):
+        self.item_errors = []
+        related = self.preload_related(data)
+        try:
+            if self.context.get('atomic', True) or not isinstance(data, list) \
+                    or (self.max_length is not None and len(data) > self.max_length):
+                return super().to_internal_value(data)
+
+            validated = []
+            for index, item in enumerate(data):
+                try:
+                    validated.append(self.run_child_validation(item))
+                except ValidationError as exc:
+                    validated.append(None)
+                    self.item_errors.append({'index': index, 'errors': exc.detail})
+            if not any(validated):
+                raise ValidationError(self.item_errors)
+            return validated
+        finally:
+            for field in related:
+                field.batch = None
+
+    def preload_related(self, data):
+        related = []
+        for name, field in self.child.fields.items():
+            if not isinstance(field, BatchPrimaryKeyRelatedField) or field.read_only:
+                continue
+            field.batch = {}
+            related.append(field)
+            if not isinstance(data, list):
+                continue
+            pks = {item[name] for item in data
+                   if isinstance(item, Mapping) and isinstance(item.get(name), (int, str))
+                   and str(item[name]).isdigit()}
+            if pks:
+                field.batch.update((str(pk), obj) for pk, obj in field.get_queryset().in_bulk(pks).items())
+        return related
+
+    def run_child_validation(self, data):
+        if not isinstance(data, Mapping):
+            message = self.child.error_messages['invalid'].format(datatype=type(data).__name__)
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='invalid')
+        return super().run_child_validation(data)
+
+    def save(self, **kwargs):
+        items = [{**attrs, **kwargs} for attrs in self.validated_data if attrs is not None]
+        with transaction.atomic():
+            self.instance = self.child.bulk_create(items) if items else []
+        return self.instance
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Drops every field not listed in `context['fields']`, which views set
+    from `?fields=`. Without it all fields are serialized. The list is for
+    the top-level serializer, nested ones keep all their fields.
+    """
+
+    @property
+    def nested(self):
+        parent = self.parent.parent if isinstance(self.parent, serializers.ListSerializer) else self.parent
+        return parent is not None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.context.get('fields')
+        if requested and not self.nested:
+            for name in list(fields):
+                if name not in requested:
+                    del fields[name]
+        return fields
 
 
 class TagSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=50)
 
-class QuestionSerializer(serializers.ModelSerializer):
+
+class TagCountSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Tag
+        fields = ['id', 'name', 'question_count']
+        list_serializer_class = ProfiledListSerializer
+
+
+class OwnerSerializer(serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    username = serializers.CharField(read_only=True)
+
+
+class QuestionSerializer(ProfiledSerializerMixin, SparseFieldsSerializerMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True)
 
     class Meta:
         model = Question
-        fields = ['id', 'title', 'description', 'tags']
+        fields = ['id', 'title', 'description', 'excerpt', 'tags', 'answer_count', 'accepted_answer',
+                  'last_activity_at']
+        read_only_fields = ['excerpt', 'answer_count', 'accepted_answer', 'last_activity_at']
+        list_serializer_class = BulkListSerializer
 
     def to_internal_value(self, data):
         tag_list = data.pop('tags', None)
@@ -19,41 +141,70 @@ class QuestionSerializer(serializers.ModelSerializer):
             data['tags'] = tags
         return super().to_internal_value(data)
 
+    def get_fields(self):
+        # `context['include']`, from `?include=`, embeds the owner and the answers, the views
+        # leave out of it the relations `?fields=` doesn't name
+        fields = super().get_fields()
+        include = self.context.get('include') or ()
+        if 'owner' in include:
+            fields['owner'] = OwnerSerializer(read_only=True)
+        if 'answers' in include:
+            fields['answers'] = AnswerSerializer(source='answer_set', many=True, read_only=True)
+        return fields
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation['tags'] = [tag['name'] for tag in representation['tags']]
+        if 'tags' in representation:
+            representation['tags'] = [tag['name'] for tag in representation['tags']]
         return representation
 
     def create(self, validated_data):
         tags = validated_data.pop('tags')
-        q = Question.objects.create(**validated_data, owner=self.context['request'].user)
-        tags_obj_list = []
-        for tag in tags:
-            t, _ = Tag.objects.get_or_create(name=tag['name'])
-            tags_obj_list.append(t)
-
-        q.tags.add(*tags_obj_list)
+        q = Question.objects.create(**validated_data, owner_id=self.context['request'].user.id)
+        set_question_tags(q, [tag['name'] for tag in tags], created=True)
         return q
 
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
         if tags:
-            tags_obj_list = []
-            for tag in tags:
-                t, _ = Tag.objects.get_or_create(name=tag['name'])
-                tags_obj_list.append(t)
-
-            instance.tags.set(tags_obj_list, clear=True)
+            set_question_tags(instance, [tag['name'] for tag in tags])
         return super().update(instance, validated_data)
 
+    def bulk_create(self, validated_list):
+        owner_id = self.context['request'].user.id
+        questions = [Question(**{key: value for key, value in data.items() if key != 'tags'}, owner_id=owner_id)
+                     for data in validated_list]
+        Question.objects.bulk_create(questions)
+        bulk_set_question_tags(questions, [[tag['name'] for tag in data['tags']] for data in validated_list])
+        prefetch_related_objects(questions, 'tags')
+        bump_version('list')
+        return questions
 
-class AnswerSerializer(serializers.ModelSerializer):
+
+class AnswerSerializer(ProfiledSerializerMixin, SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    serializer_related_field = BatchPrimaryKeyRelatedField
 
     def to_internal_value(self, data):
         data['owner'] = self.context.get('request').user.id
         return super().to_internal_value(data)
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.nested and 'owner' in (self.context.get('include') or ()):
+            fields['owner'] = OwnerSerializer(read_only=True)
+        # an answer stays on its question, the denormalized question counters rely on it
+        if self.instance is not None and 'question' in fields:
+            fields['question'].read_only = True
+        return fields
+
     class Meta:
         model = Answer
-        fields = ['id', 'question', 'owner', 'description', 'is_correct']
-        read_only_fields = ['is_correct']
+        fields = ['id', 'question', 'owner', 'description', 'excerpt', 'is_correct']
+        read_only_fields = ['excerpt', 'is_correct']
+        list_serializer_class = BulkListSerializer
+
+    def bulk_create(self, validated_list):
+        answers = Answer.objects.bulk_create([Answer(**data) for data in validated_list])
+        answers_added(answers)
+        bump_version('list', *{f'question:{answer.question_id}' for answer in answers})
+        return answers
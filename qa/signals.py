@@ -0,0 +1,114 @@
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.contrib.auth import get_user_model
+from qa.models import Tag, Question, Answer
+from qa.tags import tag_index, tag_registry
+from qa.caching import bump_version
+from qa.counters import (answers_added, answer_changed, answer_removed, owner_answers_removed,
+                         owner_questions_removed, question_tags_removed, shift_tag_counts, tags_added, tags_removed)
+
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_renamed_tag(sender, instance, created, **kwargs):
+    # a rename leaves the old name pointing at this id, and we don't know the old name here
+    if created:
+        transaction.on_commit(lambda: tag_index.add([instance.name]))
+    else:
+        tag_registry.invalidate()
+        tag_index.invalidate()
+    bump_version('list', 'tags')
+
+
+@receiver(post_delete, sender=Tag)
+def invalidate_deleted_tag(sender, instance, **kwargs):
+    tag_registry.invalidate(instance.name)
+    tag_index.invalidate()
+    bump_version('list', 'tags')
+
+
+@receiver([post_save, post_delete], sender=Question)
+def bump_question_version(sender, instance, **kwargs):
+    bump_version('list', f'question:{instance.pk}')
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def bump_answer_version(sender, instance, **kwargs):
+    bump_version('list', f'question:{instance.question_id}', f'answer:{instance.pk}')
+
+
+@receiver(m2m_changed, sender=Question.tags.through)
+def bump_question_tags_version(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        bump_version('list', 'tags')
+    else:
+        bump_version('list', f'question:{instance.pk}')
+
+
+@receiver(m2m_changed, sender=Question.tags.through)
+def count_question_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('pre_remove', 'pre_clear'):
+        # remove() may be given ids that aren't linked and clear() gives none, look up the links that go
+        links = sender.objects.filter(**{'tag' if reverse else 'question': instance})
+        if action == 'pre_remove':
+            links = links.filter(**{'question__in' if reverse else 'tag__in': pk_set})
+        instance._unlinked_ids = list(links.values_list('question_id' if reverse else 'tag_id', flat=True))
+    elif action in ('post_remove', 'post_clear'):
+        unlinked = instance.__dict__.pop('_unlinked_ids', [])
+        if reverse:
+            shift_tag_counts({instance.pk: -len(unlinked)})
+        else:
+            tags_removed(unlinked)
+    elif action == 'post_add':
+        # pk_set only holds the ids that weren't linked yet
+        if reverse:
+            shift_tag_counts({instance.pk: len(pk_set)})
+        else:
+            tags_added(pk_set)
+
+
+@receiver(pre_delete, sender=Question)
+def uncount_deleted_question_tags(sender, instance, origin=None, **kwargs):
+    # counted by uncount_deleted_owner_content in one query
+    if isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+    question_tags_removed(instance.pk)
+
+
+@receiver(post_save, sender=Answer)
+def update_question_answer_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        answers_added([instance])
+    else:
+        answer_changed(instance)
+
+
+@receiver(post_delete, sender=Answer)
+def uncount_deleted_answer(sender, instance, origin=None, **kwargs):
+    # the question goes away with its answers, nothing to count
+    if isinstance(origin, Question) or getattr(origin, 'model', None) is Question:
+        return
+    # counted by uncount_deleted_owner_content in one query
+    if isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+    answer_removed(instance)
+
+
+@receiver(pre_delete, sender=User)
+def uncount_deleted_owner_content(sender, instance, **kwargs):
+    owner_answers_removed(instance.pk)
+    owner_questions_removed(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def bump_users_version(sender, instance, created, update_fields=None, **kwargs):
+    # owners embedded with ?include=owner show the username; logins only touch last_login
+    if not created and (update_fields is None or 'username' in update_fields):
+        bump_version('users')
@@ -0,0 +1,289 @@
+import heapq
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import groupby
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from qa.counters import tags_added
+from qa.models import Question, Tag
+
+
+class TagRegistry:
+    """
+    Resolves tag names to ids in bulk, keeping a bounded LRU cache of
+    name -> id. Only ids of committed rows are cached, so a rolled back
+    transaction never leaves a dangling id behind.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def resolve(self, names):
+        """Return a {name: id} dict for `names`, creating missing tags."""
+        names = list(dict.fromkeys(names))
+        resolved, missing = self._cached(names)
+        if missing:
+            fetched = dict(Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+            new_names = [name for name in missing if name not in fetched]
+            if new_names:
+                Tag.objects.bulk_create([Tag(name=name) for name in new_names], ignore_conflicts=True)
+                fetched.update(Tag.objects.filter(name__in=new_names).values_list('name', 'id'))
+                # they were created for a question, count it until the next reload
+                transaction.on_commit(lambda: tag_index.add(new_names, question_count=1))
+            resolved.update(fetched)
+            transaction.on_commit(lambda: self._remember(fetched))
+
+        return {name: resolved[name] for name in names}
+
+    def lookup(self, names):
+        """Return a {name: id} dict for the names of existing tags only."""
+        names = list(dict.fromkeys(names))
+        resolved, missing = self._cached(names)
+        if missing:
+            fetched = dict(Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+            resolved.update(fetched)
+            transaction.on_commit(lambda: self._remember(fetched))
+        return {name: resolved[name] for name in names if name in resolved}
+
+    def _cached(self, names):
+        resolved = {}
+        missing = []
+        with self._lock:
+            for name in names:
+                tag_id = self._cache.get(name)
+                if tag_id is None:
+                    missing.append(name)
+                else:
+                    self._cache.move_to_end(name)
+                    resolved[name] = tag_id
+        return resolved, missing
+
+    def _remember(self, mapping):
+        with self._lock:
+            for name, tag_id in mapping.items():
+                self._cache[name] = tag_id
+                self._cache.move_to_end(name)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._cache
+
+    def __len__(self):
+        return len(self._cache)
+
+
+tag_registry = TagRegistry(maxsize=getattr(settings, 'QA_TAG_CACHE_SIZE', 4096))
+
+
+class TagIndex:
+    """
+    Every tag name in a sorted in-process array, for prefix lookups ranked
+    by question_count without a query. The array is loaded on first use and
+    reloaded once it is `ttl` seconds old or marked stale by `invalidate()`,
+    which is how new counts and the tags other processes created get in.
+    Tags created in this process are inserted as soon as their transaction
+    commits.
+
+    Only the first load makes lookups wait. Afterwards one thread reloads
+    while the others keep answering from the arrays they have, which are
+    never changed in place: reloads and inserts build new ones and swap them
+    in, so a lookup always sees a consistent array.
+
+    Prefixes of up to `short_prefix` characters match a large part of the
+    array, so their best `top_size` tags are ranked once, at load time;
+    longer prefixes rank the slice of the array they match.
+    """
+    short_prefix = 2
+    top_size = 50
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        # (sorted entries, top entries per short prefix), replaced as a whole
+        self._state = None
+        self._stale = False
+        self._loaded_at = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def rank(entry):
+        return -entry[2], entry[0]
+
+    def complete(self, prefix, limit=10):
+        """Up to `limit` (name, question_count) pairs of tags starting with `prefix`, ignoring case, most used first."""
+        key = prefix.casefold()
+        entries, top = self.state()
+        if len(key) <= self.short_prefix and limit <= self.top_size:
+            ranked = top.get(key, ())[:limit]
+        else:
+            start = bisect_left(entries, (key,))
+            end = bisect_left(entries, (key + '\U0010ffff',), start)
+            ranked = heapq.nsmallest(limit, entries[start:end], key=self.rank)
+        return [(name, count) for _, name, count in ranked]
+
+    def entries(self):
+        return self.state()[0]
+
+    def state(self):
+        state = self._state
+        if state is None:
+            return self.reload()
+        if self.expired() and self._lock.acquire(blocking=False):
+            # the others go on with the current arrays meanwhile
+            try:
+                if self.expired():
+                    self.refresh()
+            finally:
+                self._lock.release()
+            state = self._state
+        return state
+
+    def expired(self):
+        return self._stale or time.monotonic() - self._loaded_at > self.ttl
+
+    def reload(self):
+        with self._lock:
+            # another thread may have loaded while this one waited
+            if self._state is None or self.expired():
+                self.refresh()
+            return self._state
+
+    def refresh(self):
+        # cleared first, so an invalidation during the load isn't lost
+        self._stale = False
+        try:
+            self.load(Tag.objects.values_list('name', 'question_count').iterator(chunk_size=10000))
+        except Exception:
+            self._stale = True
+            raise
+
+    def load(self, rows):
+        """Replace the index with (name, question_count) `rows`."""
+        entries = sorted((name.casefold(), name, count) for name, count in rows)
+        top = {}
+        for length in range(1, self.short_prefix + 1):
+            # the array is sorted, so the entries sharing a prefix are contiguous
+            long_enough = (entry for entry in entries if len(entry[0]) >= length)
+            for key, group in groupby(long_enough, key=lambda entry: entry[0][:length]):
+                top[key] = heapq.nsmallest(self.top_size, group, key=self.rank)
+        self._state = entries, top
+        self._loaded_at = time.monotonic()
+
+    def add(self, names, question_count=0):
+        """Insert freshly created tags."""
+        with self._lock:
+            if self._state is None:
+                return
+            entries, top = list(self._state[0]), dict(self._state[1])
+            for name in names:
+                entry = (name.casefold(), name, question_count)
+                index = bisect_left(entries, entry[:2])
+                if index < len(entries) and entries[index][:2] == entry[:2]:
+                    continue
+                entries.insert(index, entry)
+                for length in range(1, min(len(entry[0]), self.short_prefix) + 1):
+                    key = entry[0][:length]
+                    top[key] = sorted([*top.get(key, ()), entry], key=self.rank)[:self.top_size]
+            self._state = entries, top
+
+    def invalidate(self):
+        """Have the next lookup reload the index, the ones meanwhile still use the current arrays."""
+        self._stale = True
+
+    def __len__(self):
+        return len(self._state[0]) if self._state else 0
+
+
+tag_index = TagIndex(ttl=getattr(settings, 'QA_TAG_INDEX_TTL', 300))
+
+
+def set_question_tags(question, names, created=False):
+    """Point `question.tags` at `names` using one bulk M2M write."""
+    tag_ids = list(tag_registry.resolve(names).values())
+    if created:
+        question.tags.add(*tag_ids)
+    else:
+        question.tags.set(tag_ids)
+    return tag_ids
+
+
+def bulk_set_question_tags(questions, names_lists):
+    """
+    Attach tags to freshly created `questions`, `names_lists[i]` going to
+    `questions[i]`, with one tag resolution and one M2M insert for the lot.
+    """
+    tag_ids = tag_registry.resolve(name for names in names_lists for name in names)
+    through = Question.tags.through
+    links = through.objects.bulk_create([
+        through(question_id=question.pk, tag_id=tag_ids[name])
+        for question, names in zip(questions, names_lists)
+        for name in dict.fromkeys(names)
+    ])
+    # bulk_create sends no m2m_changed
+    tags_added(link.tag_id for link in links)
+
+
+def tag_sizes(tag_ids):
+    """
+    Return {tag_id: number of questions} with the counts cached for a while.
+    They only decide the intersection order, so a stale value is harmless.
+    """
+    keys = {f'qa:tag-size:{tag_id}': tag_id for tag_id in tag_ids}
+    sizes = {keys[key]: size for key, size in cache.get_many(keys).items()}
+    missing = [tag_id for tag_id in tag_ids if tag_id not in sizes]
+    if missing:
+        counted = dict.fromkeys(missing, 0)
+        counted.update(Tag.objects.filter(pk__in=missing).values_list('pk', 'question_count'))
+        cache.set_many({f'qa:tag-size:{tag_id}': size for tag_id, size in counted.items()},
+                       timeout=getattr(settings, 'QA_TAG_SIZE_CACHE_TIMEOUT', 300))
+        sizes.update(counted)
+    return sizes
+
+
+def filter_by_tags(queryset, names):
+    """
+    Narrow `queryset` to questions carrying every tag in `names`. The posting
+    lists are intersected from the rarest tag up, so the work is bounded by the
+    smallest list rather than by the number of tags.
+    """
+    names = list(dict.fromkeys(names))
+    tag_ids = tag_registry.lookup(names)
+    if len(tag_ids) < len(names):
+        return queryset.none()
+
+    sizes = tag_sizes(list(tag_ids.values()))
+    ordered = sorted(tag_ids.values(), key=sizes.__getitem__)
+
+    through = Question.tags.through.objects
+    if sizes[ordered[0]] > getattr(settings, 'QA_TAG_FILTER_MAX_IDS', 10000):
+        # too large to materialize, let the database intersect nested subqueries
+        question_ids = through.filter(tag_id=ordered[0]).values('question_id')
+        for tag_id in ordered[1:]:
+            question_ids = through.filter(tag_id=tag_id, question_id__in=question_ids).values('question_id')
+        return queryset.filter(id__in=question_ids)
+
+    question_ids = list(through.filter(tag_id=ordered[0]).values_list('question_id', flat=True))
+    for tag_id in ordered[1:]:
+        if not question_ids:
+            break
+        question_ids = [
+            question_id
+            for start in range(0, len(question_ids), 900)
+            for question_id in through.filter(tag_id=tag_id, question_id__in=question_ids[start:start + 900])
+            .values_list('question_id', flat=True)
+        ]
+    return queryset.filter(id__in=question_ids)
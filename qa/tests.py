@@ -1,3 +1,1055 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+from base64 import urlsafe_b64encode
+from io import StringIO
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from rest_framework.viewsets import GenericViewSet
+from rest_framework import status
+from qa.models import Question, Tag, Answer
+from qa.tags import tag_index, tag_registry
+from qa.importer import secondary_index_sql
+from qa.counters import accept_answer
+from qa.caching import CachedReadMixin, bump_version, get_version
+from qa.renderers import ORJSONRenderer
 
-# Create your tests here.
+
+User = get_user_model()
+
+
+class QuestionTagTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        tag_registry.invalidate()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.headers = {'AUTHORIZATION': f'Token {self.token}'}
+
+    def test_create_question_with_tags(self):
+        Tag.objects.create(name='python')
+        data = {'title': 'title', 'description': 'description', 'tags': ['python', 'django', 'python']}
+        response = self.client.post(reverse('qa:question-list'), data=data, format='json', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(sorted(response.data['tags']), ['django', 'python'])
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_update_question_tags(self):
+        question = Question.objects.create(owner=self.user, title='title', description='description')
+        data = {'tags': ['a', 'b']}
+        url = reverse('qa:question-detail', args=[question.id])
+        response = self.client.patch(url, data=data, format='json', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data = {'tags': ['b', 'c']}
+        response = self.client.patch(url, data=data, format='json', headers=self.headers)
+        self.assertEqual(sorted(response.data['tags']), ['b', 'c'])
+        self.assertEqual(sorted(question.tags.values_list('name', flat=True)), ['b', 'c'])
+
+    def test_registry_caches_committed_tags(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ids = tag_registry.resolve(['x', 'y'])
+        self.assertIn('x', tag_registry)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(tag_registry.resolve(['y', 'x']), {'y': ids['y'], 'x': ids['x']})
+
+        Tag.objects.filter(name='x').delete()
+        self.assertNotIn('x', tag_registry)
+        self.assertIn('y', tag_registry)
+
+    def test_registry_is_bounded(self):
+        registry = type(tag_registry)(maxsize=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            registry.resolve(['a', 'b', 'c'])
+        self.assertEqual(len(registry), 2)
+        self.assertNotIn('a', registry)
+
+
+class QuestionQueryCountTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password')
+        tags = Tag.objects.bulk_create([Tag(name=f'tag{i}') for i in range(3)])
+        for i in range(10):
+            question = Question.objects.create(owner=self.user, title=f'title{i}', description='description')
+            question.tags.set(tags)
+
+    def test_list_query_count_is_constant(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('qa:question-list'))
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(sorted(response.data['results'][0]['tags']), ['tag0', 'tag1', 'tag2'])
+
+    def test_retrieve_query_count(self):
+        question = Question.objects.first()
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('qa:question-detail', args=[question.id]))
+        self.assertEqual(len(response.data['tags']), 3)
+
+
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.questions = [Question.objects.create(owner=self.user, title=f'title{i}', description='description')
+                          for i in range(5)]
+        Question.objects.update(created_date=self.questions[0].created_date)
+        Answer.objects.bulk_create([Answer(question=self.questions[0], owner=self.user, description=f'answer{i}')
+                                    for i in range(5)])
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_question_list_cursor(self):
+        ids = self.walk(reverse('qa:question-list') + '?cursor=&limit=2')
+        self.assertEqual(ids, sorted((q.id for q in self.questions), reverse=True))
+
+    def test_answers_cursor(self):
+        url = reverse('qa:question-answers', args=[self.questions[0].id])
+        ids = self.walk(url + '?cursor=&limit=2')
+        self.assertEqual(ids, list(Answer.objects.order_by('-created_date', '-id').values_list('id', flat=True)))
+
+    def test_optional_count(self):
+        response = self.client.get(reverse('qa:question-list') + '?cursor=&count=true')
+        self.assertEqual(response.data['count'], 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('qa:question-list') + '?cursor=garbage')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self):
+        # well-formed JSON whose values don't fit the ordering fields
+        for position in (['abc', 'x'], ['2024-05-14T10:00:00Z', 'x'], [[], {}], ['2024-02-30', 1]):
+            cursor = urlsafe_b64encode(json.dumps(position).encode()).decode()
+            response = self.client.get(reverse('qa:question-list') + f'?cursor={cursor}')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+
+
+class QuestionOrderingTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.old, self.active, self.new = [
+            Question.objects.create(owner=self.user, title=f'title{i}', description='description') for i in range(3)]
+
+    def ids(self, ordering, cursor=False):
+        url = reverse('qa:question-list') + f'?ordering={ordering}' + ('&cursor=' if cursor else '')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.data['results']]
+
+    def test_orderings(self):
+        Answer.objects.create(question=self.active, owner=self.user, description='answer')
+        Answer.objects.create(question=self.old, owner=self.user, description='answer')
+        Answer.objects.create(question=self.active, owner=self.user, description='answer')
+
+        self.assertEqual(self.ids('newest'), [self.new.id, self.active.id, self.old.id])
+        self.assertEqual(self.ids('activity'), [self.active.id, self.old.id, self.new.id])
+        self.assertEqual(self.ids('hot'), [self.active.id, self.old.id, self.new.id])
+        self.assertEqual(self.ids('hot', cursor=True), self.ids('hot'))
+
+    def test_accept_heats_question_once(self):
+        answer = Answer.objects.create(question=self.old, owner=self.user, description='answer')
+        url = reverse('qa:answer-mark-as-correct', args=[answer.id])
+        for _ in range(2):
+            self.client.post(url, data={'question': self.old.id}, format='json',
+                             headers={'AUTHORIZATION': f'Token {self.token}'})
+        self.old.refresh_from_db()
+        self.assertEqual(self.old.hot_score, 3.0)
+
+    @override_settings(QA_HOT_HALF_LIFE=3600, QA_HOT_MIN_SCORE=0.3)
+    def test_decay(self):
+        Question.objects.filter(pk=self.old.pk).update(hot_score=4)
+        Question.objects.filter(pk=self.active.pk).update(hot_score=0.5)
+        self.assertEqual(self.ids('hot')[0], self.old.id)
+
+        call_command('decay_hot_scores', interval=3600, stdout=StringIO())
+        self.assertEqual(dict(Question.objects.values_list('pk', 'hot_score')),
+                         {self.old.id: 2.0, self.active.id: 0.0, self.new.id: 0.0})
+        self.assertEqual(self.ids('hot'), [self.old.id, self.new.id, self.active.id])
+
+    async def test_invalid_ordering(self):
+        response = await sync_to_async(self.client.get)(reverse('qa:question-list') + '?ordering=random')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await self.async_client.get(reverse('qa:async-question-list') + '?ordering=random')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FastListTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password')
+        tags = Tag.objects.bulk_create([Tag(name=name) for name in ('python', 'جنگو', 'c++', 'x\u2028y')])
+        self.questions = []
+        for i in range(12):
+            question = Question.objects.create(owner=self.user, title=f'title {i} \u2029 é "quoted"',
+                                               description='line\nbreak \\ tab\t ' * i)
+            question.tags.set(tags[i % 4:])
+            self.questions.append(question)
+        for i, question in enumerate(self.questions[:6]):
+            for j in range(i):
+                Answer.objects.create(question=question, owner=self.user, description=f'answer {j} 😀')
+        answer = Answer.objects.filter(question=self.questions[5]).first()
+        accept_answer(self.questions[5].id, answer.id, self.user.id, answer.published_date)
+
+    def compare(self, url):
+        with override_settings(QA_FAST_LISTS=False):
+            cache.clear()
+            expected = self.client.get(url)
+        with override_settings(QA_FAST_LISTS=True):
+            cache.clear()
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content, url)
+        self.assertEqual(response.get('Last-Modified'), expected.get('Last-Modified'))
+
+    def test_byte_identical(self):
+        question_list = reverse('qa:question-list')
+        for query in ('', '?limit=5&offset=3', '?cursor=&limit=5', '?ordering=hot', '?ordering=activity&cursor=',
+                      '?tags=python', '?tags=nope', '?fields=id,excerpt,last_activity_at&cursor=',
+                      '?fields=title,tags&ordering=hot'):
+            self.compare(question_list + query)
+        self.compare(reverse('qa:question-answers', args=[self.questions[5].id]))
+        self.compare(reverse('qa:question-answers', args=[self.questions[5].id]) + '?cursor=&limit=2')
+        self.compare(reverse('qa:answer-list'))
+        self.compare(reverse('qa:answer-list') + '?limit=3&offset=2')
+        self.compare(reverse('qa:answer-list') + '?fields=id,excerpt')
+
+    def test_cursor_pages(self):
+        url = reverse('qa:question-list') + '?cursor=&limit=5'
+        with override_settings(QA_FAST_LISTS=True):
+            next_url = self.client.get(url).data['next']
+        self.compare(next_url)
+
+    def test_renderer(self):
+        data = {'text': 'é \u2028 \u2029 😀 "q" \\', 'when': timezone.now(), 'date': timezone.now().date(),
+                'nested': [{1: None, 'b': True}, 1.5, -2], 'lazy': gettext_lazy('Invalid cursor')}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(data, 'application/json; indent=4'),
+                         JSONRenderer().render(data, 'application/json; indent=4'))
+
+
+class SparseFieldsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.question = Question.objects.create(owner=self.user, title='title', description='word ' * 100)
+        self.question.tags.set([Tag.objects.create(name='python')])
+        self.answer = Answer.objects.create(question=self.question, owner=self.user, description='answer\n  text')
+
+    def test_fields(self):
+        url = reverse('qa:question-list') + '?fields=tags,id,title'
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.data['results'], [{'id': self.question.id, 'title': 'title', 'tags': ['python']}])
+        self.assertFalse(any('"description"' in query['sql'] for query in captured))
+
+        response = self.client.get(reverse('qa:question-detail', args=[self.question.id]) + '?fields=id,excerpt')
+        self.assertEqual(response.data, {'id': self.question.id, 'excerpt': self.question.excerpt})
+
+        response = self.client.get(reverse('qa:question-answers', args=[self.question.id]) + '?fields=excerpt')
+        self.assertEqual(response.data['results'], [{'excerpt': 'answer text'}])
+
+    def test_fields_skip_tags(self):
+        url = reverse('qa:question-list')
+        with CaptureQueriesContext(connection) as everything:
+            self.client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as narrowed:
+            self.client.get(url + '?fields=id')
+        self.assertEqual(len(narrowed), len(everything) - 1)
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse('qa:answer-list') + '?fields=id,password,secret')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'Unknown fields: password, secret.')
+
+    def test_writes_ignore_fields(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(reverse('qa:question-detail', args=[self.question.id]) + '?fields=id',
+                                     {'description': 'short'}, format='json')
+        self.assertEqual(response.data['excerpt'], 'short')
+        self.assertEqual(Question.objects.get(pk=self.question.id).excerpt, 'short')
+
+    def test_excerpt(self):
+        self.assertLessEqual(len(self.question.excerpt), 200)
+        self.assertTrue(self.question.excerpt.endswith('word\u2026'))
+
+        self.client.force_authenticate(self.user)
+        self.client.post(reverse('qa:question-list'), [{'title': 'bulk', 'description': ' a\tb ', 'tags': ['x']}],
+                         format='json')
+        self.assertEqual(Question.objects.get(title='bulk').excerpt, 'a b')
+
+
+class IncludeTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.other = User.objects.create_user(username='user2', password='password')
+        self.question = Question.objects.create(owner=self.user, title='title', description='description')
+        self.question.tags.set([Tag.objects.create(name='python')])
+        self.answers = [Answer.objects.create(question=self.question, owner=self.other, description=f'answer {i}')
+                        for i in range(3)]
+
+    def retrieve(self, question, include='answers,owner'):
+        return self.client.get(reverse('qa:question-detail', args=[question.id]) + f'?include={include}')
+
+    def test_retrieve(self):
+        response = self.retrieve(self.question)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tags'], ['python'])
+        self.assertEqual(response.data['owner'], {'id': self.user.id, 'username': 'user1'})
+        self.assertEqual([answer['description'] for answer in response.data['answers']],
+                         ['answer 0', 'answer 1', 'answer 2'])
+        self.assertEqual(response.data['answers'][0]['owner'], {'id': self.other.id, 'username': 'user2'})
+
+        response = self.retrieve(self.question, include='answers')
+        self.assertNotIn('owner', response.data)
+        self.assertEqual(response.data['answers'][0]['owner'], self.other.id)
+
+    def test_fixed_query_count(self):
+        other = Question.objects.create(owner=self.user, title='other', description='description')
+        for i in range(20):
+            Answer.objects.create(question=other, owner=User.objects.create_user(username=f'u{i}'), description='a')
+        with CaptureQueriesContext(connection) as few:
+            self.retrieve(self.question)
+        with CaptureQueriesContext(connection) as many:
+            self.retrieve(other)
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(len(many), 3)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('qa:question-list') + '?include=answers,owner')
+        self.assertEqual(len(captured), 4)
+        # the first QA_LIST_ANSWERS_LIMIT answers of each question
+        self.assertEqual(sum(len(question['answers']) for question in response.data['results']), 3 + 10)
+
+    @override_settings(QA_LIST_ANSWERS_LIMIT=2)
+    def test_list_answers_limit(self):
+        response = self.client.get(reverse('qa:question-list') + '?include=answers')
+        question = response.data['results'][0]
+        self.assertEqual([answer['description'] for answer in question['answers']], ['answer 0', 'answer 1'])
+        self.assertEqual(question['answer_count'], 3)
+        self.assertEqual(len(self.retrieve(self.question, include='answers').data['answers']), 3)
+
+    def test_included_fields(self):
+        response = self.client.get(reverse('qa:question-detail', args=[self.question.id]) +
+                                   '?include=answers,owner&fields=id,owner')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'id': self.question.id, 'owner': {'id': self.user.id, 'username': 'user1'}})
+
+        response = self.client.get(reverse('qa:question-list') + '?include=owner&fields=id,answers')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_include(self):
+        response = self.retrieve(self.question, include='answers,comments')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalidation(self):
+        self.retrieve(self.question)
+        self.other.username = 'renamed'
+        self.other.save()
+        response = self.retrieve(self.question)
+        self.assertEqual(response.data['answers'][0]['owner']['username'], 'renamed')
+
+        Answer.objects.create(question=self.question, owner=self.user, description='answer 3')
+        response = self.retrieve(self.question)
+        self.assertEqual(len(response.data['answers']), 4)
+
+
+class QuestionSearchTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.django = Question.objects.create(owner=self.user, title='django orm', description='django django queries')
+        self.python = Question.objects.create(owner=self.user, title='python', description='generators in django')
+        self.other = Question.objects.create(owner=self.user, title='rust', description='borrow checker')
+
+    def search(self, q):
+        return self.client.get(reverse('qa:question-search'), {'q': q})
+
+    def test_search_ranks_results(self):
+        response = self.search('django')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.django.id, self.python.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.other.description = 'django borrow'
+        self.other.save()
+        self.assertEqual(self.search('borrow').data['count'], 1)
+        self.python.delete()
+        self.assertEqual([item['id'] for item in self.search('django').data['results']],
+                         [self.django.id, self.other.id])
+
+    def test_query_syntax_is_escaped(self):
+        response = self.search('django" OR (rust')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_missing_query(self):
+        response = self.search('')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_command(self):
+        call_command('rebuild_search_index', batch_size=2, stdout=StringIO())
+        self.assertEqual(self.search('checker').data['count'], 1)
+
+
+class TagFilterTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        tag_registry.invalidate()
+        self.user = User.objects.create_user(username='user1', password='password')
+        python, django, rust = Tag.objects.bulk_create([Tag(name='python'), Tag(name='django'), Tag(name='rust')])
+        self.both = Question.objects.create(owner=self.user, title='both', description='description')
+        self.both.tags.set([python, django])
+        self.only_python = Question.objects.create(owner=self.user, title='python', description='description')
+        self.only_python.tags.set([python])
+        self.only_rust = Question.objects.create(owner=self.user, title='rust', description='description')
+        self.only_rust.tags.set([rust])
+
+    def filter(self, tags):
+        response = self.client.get(reverse('qa:question-list'), {'tags': tags})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(item['id'] for item in response.data['results'])
+
+    def test_single_tag(self):
+        self.assertEqual(self.filter('python'), sorted([self.both.id, self.only_python.id]))
+
+    def test_tag_intersection(self):
+        self.assertEqual(self.filter('python, django'), [self.both.id])
+        self.assertEqual(self.filter('python,rust'), [])
+
+    def test_unknown_tag(self):
+        self.assertEqual(self.filter('python,missing'), [])
+        self.assertFalse(Tag.objects.filter(name='missing').exists())
+
+    @override_settings(QA_TAG_FILTER_MAX_IDS=0)
+    def test_subquery_intersection(self):
+        self.assertEqual(self.filter('django,python'), [self.both.id])
+
+
+class ResponseCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.question = Question.objects.create(owner=self.user, title='title', description='description')
+        self.url = reverse('qa:question-detail', args=[self.question.id])
+
+    def test_cached_retrieve(self):
+        response = self.client.get(self.url)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.data, response.data)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_conditional_get(self):
+        response = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(self.url, headers={'If-Modified-Since': response['Last-Modified']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_writes_invalidate(self):
+        etag = self.client.get(self.url)['ETag']
+        list_etag = self.client.get(reverse('qa:question-list'))['ETag']
+        self.client.patch(self.url, data={'title': 'new title', 'tags': ['a']}, format='json',
+                          headers={'AUTHORIZATION': f'Token {self.token}'})
+
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'new title')
+        self.assertEqual(response.data['tags'], ['a'])
+        response = self.client.get(reverse('qa:question-list'), headers={'If-None-Match': list_etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        answers_url = reverse('qa:question-answers', args=[self.question.id])
+        self.assertEqual(self.client.get(answers_url).data['count'], 0)
+        Answer.objects.create(question=self.question, owner=self.user, description='answer')
+        self.assertEqual(self.client.get(answers_url).data['count'], 1)
+
+        Tag.objects.filter(name='a').update(name='b')
+        Tag.objects.get(name='b').save()
+        self.assertEqual(self.client.get(self.url).data['tags'], ['b'])
+
+    def test_default_cache_version(self):
+        class View(CachedReadMixin, GenericViewSet):
+            pass
+
+        version = View().get_cache_version()
+        self.assertEqual(version, get_version('list'))
+        bump_version('list')
+        self.assertNotEqual(View().get_cache_version(), version)
+
+
+class BulkCreateTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        tag_registry.invalidate()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.headers = {'AUTHORIZATION': f'Token {self.token}'}
+        self.question = Question.objects.create(owner=self.user, title='title', description='description')
+
+    def post(self, url, data, **params):
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.post(url, data=data, format='json', headers=self.headers)
+
+    def test_bulk_create_questions(self):
+        data = [{'title': f'title{i}', 'description': 'description', 'tags': ['python', f'tag{i}']}
+                for i in range(20)]
+        response = self.post(reverse('qa:question-list'), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(response.data['results'][3]['tags'], ['python', 'tag3'])
+        self.assertEqual(Question.objects.count(), 21)
+        self.assertEqual(Tag.objects.count(), 21)
+        self.assertEqual(Question.objects.filter(tags__name='python').count(), 20)
+
+    def test_bulk_create_answers_query_count(self):
+        data = [{'question': self.question.id, 'description': f'answer{i}'} for i in range(50)]
+        with self.assertNumQueries(7):
+            response = self.post(reverse('qa:answer-list'), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Answer.objects.filter(question=self.question, owner=self.user).count(), 50)
+
+    def test_partial_success(self):
+        data = [{'question': self.question.id, 'description': 'valid'},
+                {'question': 12345, 'description': 'missing question'},
+                'not an object']
+        response = self.post(reverse('qa:answer-list'), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertEqual(Answer.objects.count(), 1)
+
+    def test_atomic(self):
+        data = [{'question': self.question.id, 'description': 'valid'},
+                {'question': 12345, 'description': 'missing question'}]
+        response = self.post(reverse('qa:answer-list'), data, atomic='true')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Answer.objects.count(), 0)
+
+    @override_settings(QA_BULK_CREATE_MAX_ITEMS=2)
+    def test_max_items(self):
+        data = [{'question': self.question.id, 'description': 'answer'}] * 3
+        response = self.post(reverse('qa:answer-list'), data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        self.token = Token.objects.create(user=self.admin)
+        self.headers = {'AUTHORIZATION': f'Token {self.token}'}
+        for i in range(3):
+            question = Question.objects.create(owner=self.user, title=f'title{i}', description='description')
+            question.tags.set([Tag.objects.get_or_create(name=f'tag{i}')[0]])
+            Answer.objects.create(question=question, owner=self.user, description=f'answer{i}')
+
+    def read(self, response):
+        content = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_export(self):
+        response = self.client.get(reverse('qa:question-export'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        items = self.read(response)
+        self.assertEqual([item['title'] for item in items], ['title0', 'title1', 'title2'])
+        self.assertEqual(items[1]['tags'], ['tag1'])
+        self.assertEqual([answer['description'] for answer in items[1]['answers']], ['answer1'])
+
+    def test_export_since_and_gzip(self):
+        Question.objects.filter(title='title0').update(published_date='2000-01-01T00:00:00Z')
+        response = self.client.get(reverse('qa:question-export'), {'since': '2001-01-01', 'gzip': 'true'},
+                                   headers=self.headers)
+        self.assertEqual([item['title'] for item in self.read(response)], ['title1', 'title2'])
+
+    def test_export_invalid_since(self):
+        for since in ('yesterday', '2020-02-30', '2020-01-01T25:00:00'):
+            response = self.client.get(reverse('qa:question-export'), {'since': since}, headers=self.headers)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, since)
+
+    def test_export_requires_admin(self):
+        response = self.client.get(reverse('qa:question-export'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_qa', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+
+class ImportTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        tag_registry.invalidate()
+        self.dump = tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False)
+        records = [
+            {'type': 'user', 'id': 100, 'username': 'imported'},
+            {'type': 'tag', 'name': 'python'},
+            {'type': 'question', 'id': 200, 'owner': 100, 'title': 'imported question', 'description': 'body',
+             'tags': ['python', 'django'], 'created_date': '2020-01-01T00:00:00Z',
+             'published_date': '2020-01-02T00:00:00Z'},
+            {'type': 'answer', 'id': 300, 'question': 200, 'owner': 100, 'description': 'imported answer',
+             'is_correct': True},
+        ]
+        self.dump.write('\n'.join(json.dumps(record) for record in records) + '\n')
+        self.dump.close()
+
+    def tearDown(self):
+        for path in (self.dump.name, self.dump.name + '.checkpoint'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_import(self):
+        call_command('import_qa', self.dump.name, chunk_size=2, drop_indexes=True, stdout=StringIO())
+        question = Question.objects.get(pk=200)
+        self.assertEqual(question.owner.username, 'imported')
+        self.assertEqual(question.created_date.year, 2020)
+        self.assertEqual(sorted(question.tags.values_list('name', flat=True)), ['django', 'python'])
+        self.assertTrue(Answer.objects.get(pk=300).is_correct)
+        self.assertEqual(self.client.get(reverse('qa:question-search'), {'q': 'imported'}).data['count'], 1)
+
+        index_names = [name for kind, name, sql in secondary_index_sql()]
+        self.assertIn('question_created_id_idx', index_names)
+
+    def test_import_is_resumable(self):
+        call_command('import_qa', self.dump.name, chunk_size=2, stdout=StringIO())
+        call_command('import_qa', self.dump.name, chunk_size=2, stdout=StringIO())
+        self.assertEqual(Question.objects.count(), 1)
+        self.assertEqual(Answer.objects.count(), 1)
+
+        with open(self.dump.name + '.checkpoint', 'w') as file:
+            json.dump({'offset': 0, 'counts': {}}, file)
+        call_command('import_qa', self.dump.name, resume=True, stdout=StringIO())
+        self.assertEqual(Question.tags.through.objects.count(), 2)
+
+    def test_invalid_record(self):
+        with open(self.dump.name, 'a') as dump:
+            dump.write('{"type": "question", "owner": 100, "title": "title", "description": "body"}\n')
+        with self.assertRaisesMessage(CommandError, 'Line 5: question record without id'):
+            call_command('import_qa', self.dump.name, chunk_size=2, stdout=StringIO())
+        # the chunks before it are committed and the checkpoint points past them
+        self.assertEqual(Answer.objects.count(), 1)
+        with open(self.dump.name + '.checkpoint') as file:
+            self.assertEqual(json.load(file)['line'], 4)
+
+        with open(self.dump.name, 'w') as dump:
+            dump.write('["question"]\n')
+        with self.assertRaisesMessage(CommandError, 'Line 1: expected an object, got list'):
+            call_command('import_qa', self.dump.name, stdout=StringIO())
+
+
+class QuestionStatsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='password')
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.token = Token.objects.create(user=self.owner)
+        self.question = Question.objects.create(owner=self.owner, title='title', description='description')
+
+    def test_answer_count_and_activity(self):
+        first = Answer.objects.create(question=self.question, owner=self.user, description='first')
+        second = Answer.objects.create(question=self.question, owner=self.user, description='second')
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.answer_count, 2)
+        self.assertEqual(self.question.last_activity_at, second.published_date)
+
+        first.delete()
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.answer_count, 1)
+
+        response = self.client.get(reverse('qa:question-detail', args=[self.question.id]))
+        self.assertEqual(response.data['answer_count'], 1)
+        self.assertIsNone(response.data['accepted_answer'])
+
+    def test_bulk_answer_counts(self):
+        other = Question.objects.create(owner=self.owner, title='other', description='description')
+        data = [{'question': question.id, 'description': 'answer'} for question in (self.question, other, other)]
+        response = self.client.post(reverse('qa:answer-list'), data, format='json',
+                                    headers={'AUTHORIZATION': f'Token {self.token}'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(dict(Question.objects.values_list('id', 'answer_count')), {self.question.id: 1, other.id: 2})
+        latest = Answer.objects.filter(question=other).latest('published_date').published_date
+        self.assertEqual(Question.objects.get(pk=other.pk).last_activity_at, latest)
+
+    def test_answer_stays_on_its_question(self):
+        answer = Answer.objects.create(question=self.question, owner=self.owner, description='answer')
+        other = Question.objects.create(owner=self.owner, title='other', description='description')
+        response = self.client.patch(reverse('qa:answer-detail', args=[answer.id]),
+                                     {'question': other.id, 'description': 'edited'}, format='json',
+                                     headers={'AUTHORIZATION': f'Token {self.token}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['question'], self.question.id)
+        self.assertEqual(dict(Question.objects.values_list('id', 'answer_count')), {self.question.id: 1, other.id: 0})
+
+    def test_deleted_user_answers(self):
+        for owner in (self.user, self.user, self.owner):
+            Answer.objects.create(question=self.question, owner=owner, description='answer')
+        own = Question.objects.create(owner=self.user, title='title', description='description')
+        Answer.objects.create(question=own, owner=self.user, description='answer')
+
+        self.user.delete()
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.answer_count, 1)
+        self.assertFalse(Question.objects.filter(pk=own.pk).exists())
+
+    def test_accepted_answer(self):
+        answer = Answer.objects.create(question=self.question, owner=self.owner, description='answer')
+        url = reverse('qa:answer-mark-as-correct', args=[answer.id])
+        self.client.post(url, data={'question': self.question.id}, format='json',
+                         headers={'AUTHORIZATION': f'Token {self.token}'})
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.accepted_answer_id, answer.id)
+
+        answer.delete()
+        self.question.refresh_from_db()
+        self.assertIsNone(self.question.accepted_answer_id)
+        self.assertEqual(self.question.answer_count, 0)
+
+    def test_reconcile(self):
+        Answer.objects.bulk_create([Answer(question=self.question, owner=self.user, description='answer', is_correct=True)
+                                    for _ in range(3)])
+        call_command('reconcile_questions', batch_size=1, stdout=StringIO())
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.answer_count, 3)
+        self.assertIsNotNone(self.question.accepted_answer_id)
+        # nothing drifted since, nothing to write
+        with CaptureQueriesContext(connection) as captured:
+            call_command('reconcile_questions', stdout=StringIO())
+        self.assertFalse([query for query in captured if query['sql'].startswith('UPDATE')])
+
+    def test_reconcile_invalidates_cache(self):
+        cache.clear()
+        detail_url = reverse('qa:question-detail', args=[self.question.id])
+        self.assertEqual(self.client.get(reverse('qa:question-list')).data['results'][0]['answer_count'], 0)
+        self.assertEqual(self.client.get(detail_url).data['answer_count'], 0)
+        # bulk_create sends no signals, the counter drifts
+        Answer.objects.bulk_create([Answer(question=self.question, owner=self.user, description='answer')])
+        call_command('reconcile_questions', stdout=StringIO())
+        self.assertEqual(self.client.get(reverse('qa:question-list')).data['results'][0]['answer_count'], 1)
+        self.assertEqual(self.client.get(detail_url).data['answer_count'], 1)
+
+
+class TagCountTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        tag_registry.invalidate()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.client.force_authenticate(self.user)
+        self.tags = {name: Tag.objects.create(name=name) for name in ('python', 'django', 'sqlite')}
+
+    def assertCounts(self, expected):
+        actual = dict(Tag.objects.values_list('name', 'question_count'))
+        counted = dict(Tag.objects.annotate(count=Count('question')).values_list('name', 'count'))
+        self.assertEqual(actual, counted)
+        self.assertEqual({name: count for name, count in actual.items() if name in expected}, expected)
+
+    def create(self, *tags):
+        response = self.client.post(reverse('qa:question-list'),
+                                    {'title': 'title', 'description': 'description', 'tags': list(tags)},
+                                    format='json')
+        return Question.objects.get(pk=response.data['id'])
+
+    def test_question_writes(self):
+        first = self.create('python', 'django')
+        self.create('python', 'new')
+        self.client.post(reverse('qa:question-list'),
+                         [{'title': 'bulk', 'description': 'description', 'tags': ['python', 'sqlite']}] * 2,
+                         format='json')
+        self.assertCounts({'python': 4, 'django': 1, 'sqlite': 2, 'new': 1})
+
+        self.client.patch(reverse('qa:question-detail', args=[first.id]), {'tags': ['sqlite', 'new']}, format='json')
+        self.assertCounts({'python': 3, 'django': 0, 'sqlite': 3, 'new': 2})
+
+        self.client.delete(reverse('qa:question-detail', args=[first.id]))
+        self.assertCounts({'python': 3, 'django': 0, 'sqlite': 2, 'new': 1})
+
+    def test_m2m_changes(self):
+        question = self.create('python')
+        question.tags.remove(self.tags['django'])
+        question.tags.add(self.tags['python'], self.tags['django'])
+        self.assertCounts({'python': 1, 'django': 1, 'sqlite': 0})
+
+        other = Question.objects.create(owner=self.user, title='title', description='description')
+        self.tags['sqlite'].question_set.add(question, other)
+        self.tags['python'].question_set.remove(question)
+        self.assertCounts({'python': 0, 'django': 1, 'sqlite': 2})
+
+        question.tags.clear()
+        self.tags['sqlite'].question_set.clear()
+        self.assertCounts({'python': 0, 'django': 0, 'sqlite': 0})
+
+    def test_deleted_user(self):
+        self.create('python', 'django')
+        other = User.objects.create_user(username='user2', password='password')
+        Question.objects.create(owner=other, title='title', description='description').tags.add(self.tags['python'])
+        self.user.delete()
+        self.assertCounts({'python': 1, 'django': 0})
+
+    def test_tag_list(self):
+        self.create('python', 'django')
+        self.create('python')
+        response = self.client.get(reverse('qa:tag-list'))
+        self.assertEqual([(tag['name'], tag['question_count']) for tag in response.data['results']],
+                         [('python', 2), ('django', 1)])
+
+    def test_reconcile(self):
+        self.create('python')
+        Tag.objects.update(question_count=7)
+        call_command('reconcile_tags', batch_size=1, stdout=StringIO())
+        self.assertCounts({'python': 1, 'django': 0})
+
+
+class TagAutocompleteTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        tag_registry.invalidate()
+        tag_index.invalidate()
+        self.user = User.objects.create_user(username='user1', password='password')
+        Tag.objects.bulk_create([Tag(name='python', question_count=5), Tag(name='Pyramid', question_count=9),
+                                 Tag(name='pytest', question_count=5), Tag(name='django', question_count=7)])
+
+    def complete(self, prefix):
+        response = self.client.get(reverse('qa:tag-autocomplete'), {'prefix': prefix})
+        return [tag['name'] for tag in response.data]
+
+    def test_ranking(self):
+        self.assertEqual(self.complete('py'), ['Pyramid', 'pytest', 'python'])
+        self.assertEqual(self.complete('PYT'), ['pytest', 'python'])
+        self.assertEqual(self.complete('pyth'), ['python'])
+        self.assertEqual(self.complete('rust'), [])
+        with override_settings(QA_TAG_AUTOCOMPLETE_LIMIT=1):
+            self.assertEqual(self.complete('p'), ['Pyramid'])
+
+    def test_no_queries_once_loaded(self):
+        self.complete('d')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete('dj'), ['django'])
+            self.assertEqual(self.complete('djan'), ['django'])
+
+    def test_new_tags(self):
+        self.complete('p')
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('qa:question-list'),
+                             {'title': 'title', 'description': 'description', 'tags': ['pydantic', 'python']},
+                             format='json')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete('pyd'), ['pydantic'])
+            self.assertEqual(self.complete('py'), ['Pyramid', 'pytest', 'python', 'pydantic'])
+
+        Tag.objects.filter(name='pydantic').delete()
+        self.assertEqual(self.complete('pyd'), [])
+
+    def test_stale_index_reloads(self):
+        self.complete('p')
+        Tag.objects.filter(name='pytest').update(question_count=10)
+        self.assertEqual(self.complete('py')[0], 'Pyramid')
+        with mock.patch.object(tag_index, 'ttl', 0):
+            self.assertEqual(self.complete('py')[0], 'pytest')
+
+    def test_stale_index_served_while_reloading(self):
+        self.complete('p')
+        Tag.objects.filter(name='pytest').update(question_count=10)
+        tag_index.invalidate()
+        # as if another thread were reloading
+        with tag_index._lock, self.assertNumQueries(0):
+            self.assertEqual(self.complete('py')[0], 'Pyramid')
+        self.assertEqual(self.complete('py')[0], 'pytest')
+
+    def test_prefix_required(self):
+        response = self.client.get(reverse('qa:tag-autocomplete'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MarkAsCorrectTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='password')
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.headers = {'AUTHORIZATION': f'Token {Token.objects.create(user=self.owner)}'}
+        self.question = Question.objects.create(owner=self.owner, title='title', description='description')
+        self.first = Answer.objects.create(question=self.question, owner=self.user, description='first')
+        self.second = Answer.objects.create(question=self.question, owner=self.user, description='second')
+
+    def mark(self, answer_id, question_id, headers=None):
+        url = reverse('qa:answer-mark-as-correct', args=[answer_id])
+        return self.client.post(url, data={'question': question_id}, headers=headers or self.headers)
+
+    def test_switch_accepted_answer(self):
+        response = self.mark(self.first.id, self.question.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'id': self.first.id, 'question': self.question.id, 'is_correct': True})
+
+        with self.assertNumQueries(4):
+            self.mark(self.second.id, self.question.id)
+        self.assertEqual(list(Answer.objects.filter(is_correct=True).values_list('id', flat=True)), [self.second.id])
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.accepted_answer_id, self.second.id)
+
+    def test_errors(self):
+        other = Question.objects.create(owner=self.user, title='other', description='description')
+        other_answer = Answer.objects.create(question=other, owner=self.owner, description='answer')
+
+        self.assertEqual(self.mark(self.first.id, 12345).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.mark(other_answer.id, other.id).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.mark(other_answer.id, self.question.id).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.mark(12345, self.question.id).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.mark(self.first.id, 'abc').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Answer.objects.filter(is_correct=True).exists())
+
+
+class AsyncReadTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        tag_registry.invalidate()
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.question = Question.objects.create(owner=self.user, title='title', description='description')
+        self.question.tags.set([Tag.objects.create(name='python')])
+        self.answer = Answer.objects.create(question=self.question, owner=self.user, description='answer')
+        other = Question.objects.create(owner=self.user, title='other', description='other description')
+        other.tags.set([Tag.objects.create(name='django')])
+        Answer.objects.create(question=self.question, owner=self.user, description='second answer')
+
+    def get(self, name, *args, query='', **headers):
+        return self.async_client.get(reverse(f'qa:{name}', args=args) + query,
+                                     headers={'AUTHORIZATION': f'Token {self.token}', **headers})
+
+    async def compare(self, sync_name, async_name, *args, query=''):
+        expected = await sync_to_async(self.client.get)(reverse(f'qa:{sync_name}', args=args) + query)
+        response = await self.get(async_name, *args, query=query)
+        self.assertEqual(response.status_code, expected.status_code, query)
+        # next links point to the endpoint they come from
+        self.assertEqual(json.loads(response.content.replace(b'/async/', b'/')), json.loads(expected.content), query)
+
+    async def test_async_reads_match_sync_reads(self):
+        await self.compare('question-list', 'async-question-list')
+        await self.compare('question-detail', 'async-question-detail', self.question.id)
+        await self.compare('question-detail', 'async-question-detail', 12345)
+        await self.compare('question-answers', 'async-question-answers', self.question.id)
+        await self.compare('answer-list', 'async-answer-list')
+        await self.compare('answer-detail', 'async-answer-detail', self.answer.id)
+
+    async def test_async_query_params(self):
+        for query in ('?tags=python', '?tags=nope', '?ordering=hot', '?limit=1&offset=1', '?cursor=&limit=1',
+                      '?cursor=&limit=1&count=true&ordering=activity', '?fields=id,tags', '?include=answers,owner',
+                      '?fields=title,answers&include=answers', '?fields=id&include=owner'):
+            await self.compare('question-list', 'async-question-list', query=query)
+        for query in ('?fields=id,excerpt', '?include=owner', '?fields=id,owner&include=answers,owner'):
+            await self.compare('question-detail', 'async-question-detail', self.question.id, query=query)
+        for query in ('?cursor=&limit=1', '?fields=id,description'):
+            await self.compare('question-answers', 'async-question-answers', self.question.id, query=query)
+        await self.compare('answer-list', 'async-answer-list', query='?fields=id&limit=1')
+
+        response = await self.get('async-question-list', query='?cursor=&limit=1')
+        next_page = json.loads(response.content)['next']
+        await self.compare('question-list', 'async-question-list', query='?' + next_page.split('?', 1)[1])
+
+    async def test_async_invalid_query_params(self):
+        for query in ('?page=2', '?fields=nope', '?include=tags', '?ordering=random', '?search=x'):
+            response = await self.get('async-question-list', query=query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+        # the answer list has no keyset pagination, nor questions an ordering
+        response = await self.get('async-answer-list', query='?cursor=')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await self.get('async-question-detail', self.question.id, query='?ordering=hot')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await self.get('async-question-list', query='?cursor=WyJhYmMiLCAieCJd')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_conditional_get(self):
+        response = await self.get('async-question-detail', self.question.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+        # an update() bumps no version, the cached response is still served
+        await Question.objects.filter(pk=self.question.id).aupdate(title='unseen')
+        cached = await self.get('async-question-detail', self.question.id)
+        not_modified = await self.get('async-question-detail', self.question.id, **{'If-None-Match': response['ETag']})
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        await sync_to_async(self.client.patch)(reverse('qa:question-detail', args=[self.question.id]),
+                                               {'title': 'changed'}, format='json',
+                                               headers={'AUTHORIZATION': f'Token {self.token}'})
+        response = await self.get('async-question-detail', self.question.id, **{'If-None-Match': response['ETag']})
+        self.assertEqual(json.loads(response.content)['title'], 'changed')
+
+    async def test_async_invalid_token(self):
+        response = await self.async_client.get(reverse('qa:async-question-list'),
+                                               headers={'AUTHORIZATION': 'Token invalid'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LoadTestingTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        tag_registry.invalidate()
+
+    def test_seed(self):
+        call_command('seed_qa', users=20, tags=10, questions=300, answers=2, batch_size=100, stdout=StringIO())
+        self.assertEqual(User.objects.filter(username__startswith='seed_user_').count(), 20)
+        self.assertEqual(Question.objects.count(), 300)
+        self.assertEqual(Answer.objects.count(), sum(Question.objects.values_list('answer_count', flat=True)))
+
+        # zipf: the busiest user owns far more questions than the median one
+        owners = sorted(User.objects.annotate(count=Count('question')).values_list('count', flat=True))
+        self.assertGreater(owners[-1], 3 * owners[len(owners) // 2])
+
+        # seeding again adds users instead of clashing on usernames
+        call_command('seed_qa', users=5, tags=10, questions=10, stdout=StringIO())
+        self.assertEqual(User.objects.filter(username__startswith='seed_user_').count(), 25)
+
+    def test_loadtest(self):
+        call_command('seed_qa', users=5, tags=5, questions=20, stdout=StringIO())
+        questions = Question.objects.count()
+        out = StringIO()
+        call_command('loadtest_qa', requests=2, stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+
+        self.assertIn('question-list', report['endpoints'])
+        self.assertIn('async-answer-detail', report['endpoints'])
+        self.assertIn('logout', report['endpoints'])
+        for name, result in report['endpoints'].items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertEqual(set(result), {'requests', 'errors', 'p50_ms', 'p95_ms', 'p99_ms',
+                                           'requests_per_second', 'queries_avg', 'queries_max'})
+        # writes are rolled back
+        self.assertEqual(Question.objects.count(), questions)
+        self.assertFalse(User.objects.filter(username__startswith='load_').exists())
@@ -1,5 +1,6 @@
 from rest_framework.routers import DefaultRouter
-from qa.views import QuestionViewSet, AnswerViewSet
+from qa.views import QuestionViewSet, AnswerViewSet, TagViewSet
+from qa.async_views import AsyncQuestionView, AsyncQuestionAnswersView, AsyncAnswerView
 from django.urls import path
 
 app_name = 'qa'
@@ -7,4 +8,11 @@ app_name = 'qa'
 router = DefaultRouter()
 router.register('question', QuestionViewSet, basename='question')
 router.register('answer', AnswerViewSet, basename='answer')
-urlpatterns = router.urls
+router.register('tag', TagViewSet, basename='tag')
+urlpatterns = router.urls + [
+    path('async/question/', AsyncQuestionView.as_view(), name='async-question-list'),
+    path('async/question/<int:pk>/', AsyncQuestionView.as_view(), name='async-question-detail'),
+    path('async/question/<int:pk>/answers/', AsyncQuestionAnswersView.as_view(), name='async-question-answers'),
+    path('async/answer/', AsyncAnswerView.as_view(), name='async-answer-list'),
+    path('async/answer/<int:pk>/', AsyncAnswerView.as_view(), name='async-answer-detail'),
+]
@@ -1,30 +1,282 @@
-from rest_framework.viewsets import ModelViewSet
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
+from rest_framework.mixins import ListModelMixin
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, IsAdminUser, SAFE_METHODS
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import Http404
-from qa.models import Question, Answer
-from qa.serializers import QuestionSerializer, AnswerSerializer
+from rest_framework.settings import api_settings
+from django.conf import settings
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from qa import fastpath
+from qa.models import Question, Answer, Tag
+from qa.serializers import QuestionSerializer, AnswerSerializer, TagCountSerializer
 from qa.permissions import IsOwnerOrReadOnly
+from qa.pagination import KeysetPagination
+from qa.search import QuestionSearch
+from qa.tags import filter_by_tags, tag_index
+from qa.caching import CachedReadMixin, cached_response, get_version
+from qa.counters import accept_answer
+from qa.ranking import ORDERINGS
+from qa.export import export_questions, gzip_stream, parse_since
+from main.profiling import serializing
 
 
-class QuestionViewSet(ModelViewSet):
+INCLUDES = ('answers', 'owner')
+# columns deferred when `?fields=` doesn't ask for them
+DEFERRABLE_FIELDS = {Question: ('title', 'description', 'excerpt'), Answer: ('description', 'excerpt')}
+
+
+# The query parameters of the read endpoints, shared by the DRF views and the async ones of qa.async_views.
+
+def parse_fields(query_params, available):
+    """The fields of `available` that `?fields=` asks for, in that order, or None for all of them."""
+    fields = query_params.get('fields')
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = sorted(requested.difference(available))
+    if unknown:
+        raise ParseError(f'Unknown fields: {", ".join(unknown)}.')
+    return [name for name in available if name in requested]
+
+
+def parse_include(query_params):
+    """The relations `?include=answers,owner` embeds in each question."""
+    include = {name.strip() for name in query_params.get('include', '').split(',') if name.strip()}
+    if not include.issubset(INCLUDES):
+        raise ParseError(f'include must be a comma-separated subset of {", ".join(INCLUDES)}.')
+    return include
+
+
+def include_fields(available, include):
+    """`available` plus the relations of `include`, which `?fields=` may name too."""
+    return [*available, *(name for name in INCLUDES if name in include)]
+
+
+def narrow_include(include, fields):
+    """The relations of `include` that `fields` keeps, all of them without `?fields=`."""
+    return {name for name in include if not fields or name in fields}
+
+
+def parse_ordering(query_params):
+    """The order `?ordering=activity|hot|newest` asks for, see qa.ranking, or None for the default one."""
+    mode = query_params.get('ordering')
+    if not mode:
+        return None
+    if mode not in ORDERINGS:
+        raise ParseError(f'ordering must be one of {", ".join(sorted(ORDERINGS))}.')
+    return ORDERINGS[mode]
+
+
+def narrow(queryset, fields):
+    """`queryset` without the text columns behind the fields `fields` leaves out."""
+    deferred = [name for name in DEFERRABLE_FIELDS.get(queryset.model, ()) if fields and name not in fields]
+    return queryset.defer(*deferred) if deferred else queryset
+
+
+def question_queryset(fields=None, include=(), answers_limit=None):
+    """
+    Questions with what QuestionSerializer reads for `fields` and `include`
+    fetched along. `answers_limit` caps the answers embedded per question,
+    their `answer_count` tells how many there are in all.
+    """
+    queryset = narrow(Question.objects.all(), fields)
+    if not fields or 'tags' in fields:
+        queryset = queryset.prefetch_related('tags')
+    if 'owner' in include:
+        queryset = queryset.select_related('owner')
+    if 'answers' in include:
+        answers = Answer.objects.order_by('created_date', 'id')
+        if 'owner' in include:
+            answers = answers.select_related('owner')
+        if answers_limit is not None:
+            # numbered per question by a window function, still one query
+            answers = answers.annotate(
+                position=Window(RowNumber(), partition_by=F('question'), order_by=('created_date', 'id')),
+            ).filter(position__lte=answers_limit)
+        # one query for the answers of the whole page, however many there are
+        queryset = queryset.prefetch_related(Prefetch('answer_set', queryset=answers))
+    return queryset
+
+
+def filter_question_list(queryset, query_params):
+    """Apply `?tags=` and `?ordering=` of the question list."""
+    tags = [tag.strip() for tag in query_params.get('tags', '').split(',') if tag.strip()]
+    if tags:
+        queryset = filter_by_tags(queryset, tags)
+    ordering = parse_ordering(query_params)
+    if ordering:
+        queryset = queryset.order_by(*ordering)
+    return queryset
+
+
+class BulkCreateMixin:
+    """
+    Lets POST on the collection take a JSON array, validated with `many=True`
+    and inserted in one transaction. `?atomic=true|false` overrides the
+    QA_BULK_CREATE_ATOMIC setting: atomic requests fail as a whole on any
+    invalid item, otherwise the valid items are created and the invalid ones
+    reported by index.
+    """
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        atomic = request.query_params.get('atomic')
+        context = self.get_serializer_context()
+        context['atomic'] = atomic in ('1', 'true') if atomic else getattr(settings, 'QA_BULK_CREATE_ATOMIC', False)
+        serializer = self.get_serializer(data=request.data, many=True, context=context,
+                                         max_length=getattr(settings, 'QA_BULK_CREATE_MAX_ITEMS', 1000))
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response({'results': serializer.data, 'errors': serializer.item_errors},
+                        status=status.HTTP_201_CREATED)
+
+
+class ThrottledCreateMixin:
+    """Rate limits the create action at the `create_throttle_scope` rate of DEFAULT_THROTTLE_RATES."""
+    create_throttle_scope = None
+
+    @property
+    def throttle_scope(self):
+        return self.create_throttle_scope if self.action == 'create' else None
+
+
+class SparseFieldsMixin:
+    """
+    `?fields=id,title,tags` on reads narrows the output to those serializer
+    fields, and the text columns behind the fields left out aren't read
+    from the database at all. Unknown field names are a 400.
+    """
+    requested_fields = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.requested_fields = self.get_requested_fields()
+
+    def get_requested_fields(self):
+        if self.request.method not in SAFE_METHODS:
+            return None
+        return parse_fields(self.request.query_params, self.get_available_fields())
+
+    def get_available_fields(self):
+        return self.get_serializer_class().Meta.fields
+
+    def narrow(self, queryset):
+        return narrow(queryset, self.requested_fields)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.requested_fields
+        return context
+
+
+class FastListMixin:
+    """
+    With QA_FAST_LISTS on, list actions page through `.values()` rows and
+    turn them into the serializer's output with the plain functions of
+    qa.fastpath, skipping model and serializer instances per row.
+    """
+
+    def fast_list(self, rows, representation):
+        page = self.paginate_queryset(rows)
+        if page is None:
+            page = list(rows)
+        # the serializer time of the profiler, as DRF serializers would count it
+        with serializing():
+            data = representation(page, self.requested_fields)
+        if self.paginator is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class QuestionViewSet(ThrottledCreateMixin, BulkCreateMixin, SparseFieldsMixin, FastListMixin, CachedReadMixin,
+                      ModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    create_throttle_scope = 'question-create'
+    include = frozenset()
+
+    @property
+    def pagination_class(self):
+        # `?cursor=` switches list and answers to keyset pagination
+        request = getattr(self, 'request', None)
+        if request is not None and self.action in ('list', 'answers') \
+                and KeysetPagination.cursor_query_param in request.query_params:
+            return KeysetPagination
+        return api_settings.DEFAULT_PAGINATION_CLASS
 
     def get_serializer_class(self):
         if self.action == 'answers':
             return AnswerSerializer
         return QuestionSerializer
 
+    def initial(self, request, *args, **kwargs):
+        # before the fields, which may name the included relations
+        self.include = self.get_include()
+        super().initial(request, *args, **kwargs)
+        self.include = narrow_include(self.include, self.requested_fields)
+
+    def get_available_fields(self):
+        return include_fields(super().get_available_fields(), self.include)
+
+    def get_include(self):
+        # `?include=` is for list and retrieve
+        if self.action not in ('list', 'retrieve'):
+            return set()
+        return parse_include(self.request.query_params)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include'] = self.include
+        return context
+
     def get_queryset(self):
         if self.action == 'answers':
-            return Answer.objects.all()
-        return Question.objects.all()
+            return self.narrow(Answer.objects.all())
+        if self.action == 'list':
+            queryset = question_queryset(self.requested_fields, self.include,
+                                         getattr(settings, 'QA_LIST_ANSWERS_LIMIT', 10))
+            return filter_question_list(queryset, self.request.query_params)
+        return question_queryset(self.requested_fields, self.include)
+
+    def get_ordering(self):
+        # the keyset pagination of the list follows `?ordering=`
+        return parse_ordering(self.request.query_params) if self.action == 'list' else None
+
+    def get_cache_version(self):
+        # embedded owners are stale once a username changes
+        users = ('users',) if 'owner' in self.include else ()
+        if self.action in ('retrieve', 'answers'):
+            return get_version('tags', f'question:{self.kwargs["pk"]}', *users)
+        return get_version('list', *users)
+
+    def note_modified(self, objects):
+        super().note_modified(objects)
+        if 'answers' in self.include:
+            for question in objects:
+                super().note_modified(question.answer_set.all())
+
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        if fastpath.enabled() and not self.include:
+            return self.fast_list(fastpath.question_rows(self.get_queryset()), fastpath.questions_representation)
+        return super().list(request, *args, **kwargs)
+
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(detail=True, methods=['get'])
+    @cached_response
     def answers(self, request, *args, **kwargs):
         queryset = self.get_queryset().filter(question=kwargs['pk'])
+        if fastpath.enabled():
+            return self.fast_list(fastpath.answer_rows(queryset), fastpath.answers_representation)
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -32,37 +284,111 @@ class QuestionViewSet(ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def search(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'detail': 'q parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = QuestionSearch(query, self.get_queryset())
+        page = self.paginate_queryset(results)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(results[:], many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request, *args, **kwargs):
+        since = None
+        if request.query_params.get('since'):
+            since = parse_since(request.query_params['since'])
+            if since is None:
+                return Response({'detail': 'since must be a date or datetime.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        lines = export_questions(since=since, chunk_size=getattr(settings, 'QA_EXPORT_CHUNK_SIZE', 500))
+        if request.query_params.get('gzip') in ('1', 'true'):
+            response = StreamingHttpResponse(gzip_stream(lines), content_type='application/x-ndjson')
+            response['Content-Encoding'] = 'gzip'
+            return response
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson')
 
-class AnswerViewSet(ModelViewSet):
+
+class AnswerViewSet(ThrottledCreateMixin, BulkCreateMixin, SparseFieldsMixin, FastListMixin, CachedReadMixin,
+                    ModelViewSet):
     queryset = Answer.objects.all()
     serializer_class = AnswerSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    create_throttle_scope = 'answer-create'
+
+    def get_queryset(self):
+        return self.narrow(super().get_queryset())
+
+    def get_cache_version(self):
+        if self.action == 'retrieve':
+            return get_version('accepted', f'answer:{self.kwargs["pk"]}')
+        return super().get_cache_version()
+
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        if fastpath.enabled():
+            return self.fast_list(fastpath.answer_rows(self.get_queryset()), fastpath.answers_representation)
+        return super().list(request, *args, **kwargs)
+
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     # just owner of question can use this action
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def mark_as_correct(self, request, *args, **kwargs):
         question_id = request.data.get('question')
         if not question_id:
             return Response({'detail': 'question field is required.'}, status=status.HTTP_400_BAD_REQUEST)
-
         try:
-            question = Question.objects.only('owner').get(pk=question_id)
-        except Question.DoesNotExist:
+            question_id = int(question_id)
+            answer_id = int(kwargs['pk'])
+        except (TypeError, ValueError):
+            return Response({'detail': 'question and answer must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if accept_answer(question_id, answer_id, request.user.id, timezone.now()):
+            return Response({'id': answer_id, 'question': question_id, 'is_correct': True})
+
+        # nothing was updated, find out why
+        owner_id = Question.objects.filter(pk=question_id).values_list('owner_id', flat=True).first()
+        if owner_id is None:
             raise Http404('No Question matches the given query.')
 
-        if question.owner_id != request.user.id:
+        if owner_id != request.user.id:
             return Response({'detail': 'You aren\'t the owner of the specified question.'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        answer = self.get_object()
-        if answer.question_id != question_id:
-            return Response(
-                {'detail': 'This answer isn\'t related to this specific question.'},
-                status=status.HTTP_400_BAD_REQUEST)
+        if not Answer.objects.filter(pk=answer_id).exists():
+            raise Http404('No Answer matches the given query.')
+        return Response(
+            {'detail': 'This answer isn\'t related to this specific question.'},
+            status=status.HTTP_400_BAD_REQUEST)
+
+
+class TagViewSet(CachedReadMixin, ListModelMixin, GenericViewSet):
+    """Tags in use, most used first, from the question_count column kept up to date by qa.signals."""
+    queryset = Tag.objects.filter(question_count__gt=0).order_by('-question_count', 'name')
+    serializer_class = TagCountSerializer
+    cache_scopes = ('list', 'tags')
+
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-        answer.is_correct = True
-        answer.save()
-        return Response(self.get_serializer(answer).data)
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def autocomplete(self, request, *args, **kwargs):
+        # served from the in-process qa.tags.tag_index, no query once it is loaded
+        prefix = request.query_params.get('prefix', '').strip()
+        if not prefix:
+            return Response({'detail': 'prefix parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = getattr(settings, 'QA_TAG_AUTOCOMPLETE_LIMIT', 10)
+        return Response([{'name': name, 'question_count': count} for name, count in tag_index.complete(prefix, limit)])
 
 
 # class AnswerGenericView(
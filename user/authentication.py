@@ -0,0 +1,106 @@
+from functools import partial
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+# marks a token whose snapshot was just invalidated, so a request that read the
+# token before the invalidation can't put the old snapshot back
+REVOKED = 'revoked'
+
+
+def get_cache():
+    return caches[getattr(settings, 'USER_TOKEN_CACHE', 'default')]
+
+
+def token_cache_key(key):
+    return f'user:token:{key}'
+
+
+def user_cache_key(user_id):
+    return f'user:token-of:{user_id}'
+
+
+def forget_token(key):
+    get_cache().set(token_cache_key(key), REVOKED, timeout=getattr(settings, 'USER_TOKEN_CACHE_TIMEOUT', 60))
+
+
+def forget_user(user_id):
+    key = get_cache().get(user_cache_key(user_id))
+    if key is not None:
+        forget_token(key)
+
+
+class TokenUser(SimpleLazyObject):
+    """
+    The user of a cached token. Its id is known without a query, reading
+    anything else loads the user, once, the first time.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id):
+        super().__init__(partial(get_user_model()._default_manager.get, pk=user_id))
+        self.__dict__.update(pk=user_id, id=user_id)
+
+    def __bool__(self):
+        return True
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that keeps the (user id, is_active) of a token in
+    the cache for USER_TOKEN_CACHE_TIMEOUT seconds instead of querying Token
+    JOIN User on every request. The user is loaded only if the view reads
+    more of it than its id. Deleting the token, which logout and user
+    deletion do, or saving the user drops the cached entry.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_cache()
+        cached = cache.get(token_cache_key(key))
+        if cached is not None and cached != REVOKED:
+            return self.cached_credentials(key, *cached)
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if cached is None:
+            timeout = getattr(settings, 'USER_TOKEN_CACHE_TIMEOUT', 60)
+            if cache.add(token_cache_key(key), (token.user_id, token.user.is_active), timeout=timeout):
+                cache.set(user_cache_key(token.user_id), key, timeout=timeout)
+        return self.check_active(token.user, token)
+
+    async def aauthenticate_credentials(self, key):
+        """`authenticate_credentials()` for async views, on the async cache and ORM APIs."""
+        cache = get_cache()
+        cached = await cache.aget(token_cache_key(key))
+        if cached is not None and cached != REVOKED:
+            return self.cached_credentials(key, *cached)
+
+        model = self.get_model()
+        try:
+            token = await model.objects.select_related('user').aget(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if cached is None:
+            timeout = getattr(settings, 'USER_TOKEN_CACHE_TIMEOUT', 60)
+            if await cache.aadd(token_cache_key(key), (token.user_id, token.user.is_active), timeout=timeout):
+                await cache.aset(user_cache_key(token.user_id), key, timeout=timeout)
+        return self.check_active(token.user, token)
+
+    def cached_credentials(self, key, user_id, is_active):
+        if not is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return TokenUser(user_id), self.get_model()(key=key, user_id=user_id)
+
+    def check_active(self, user, token):
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return user, token
@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import forget_token, forget_user
+
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    # a tombstone under the token's own key, user deletion cascades here too
+    forget_token(instance.key)
+
+
+@receiver([post_save, post_delete], sender=User)
+def forget_changed_user(sender, instance, **kwargs):
+    # the cached entry holds is_active
+    forget_user(instance.pk)
@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 from rest_framework import status
+from user.authentication import REVOKED, CachedTokenAuthentication, token_cache_key
 
 
 User = get_user_model()
@@ -121,3 +123,62 @@ class LoginLogoutTestCase(APITestCase):
 
         user_token_count = Token.objects.filter(user=self.user).count()
         self.assertEqual(user_token_count, 0)
+
+
+class CachedTokenAuthenticationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.headers = {'AUTHORIZATION': f'Token {self.token.key}'}
+
+    def test_token_is_cached(self):
+        response = self.client.get(reverse('user:user'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the user by its pk, the token isn't looked up
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('user:user'), headers=self.headers)
+        self.assertEqual(response.data['username'], 'user1')
+
+    def test_user_loaded_on_use(self):
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = authentication.authenticate_credentials(self.token.key)
+            self.assertTrue(user and user.is_authenticated)
+            self.assertEqual((user.pk, user.id), (self.user.pk, self.user.pk))
+            self.assertEqual((token.key, token.user_id), (self.token.key, self.user.pk))
+        self.assertEqual(cache.get(token_cache_key(self.token.key)), (self.user.pk, True))
+
+        # only the id is cached, a renamed user is read as it is now
+        User.objects.filter(pk=self.user.pk).update(username='renamed')
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, 'renamed')
+            self.assertEqual(user.email, self.user.email)
+
+    def test_logout_revokes_cached_token(self):
+        self.client.get(reverse('user:user'), headers=self.headers)
+        response = self.client.post(reverse('user:logout'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get(reverse('user:user'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_delete_leaves_tombstone(self):
+        self.client.get(reverse('user:user'), headers=self.headers)
+        Token.objects.filter(pk=self.token.pk).delete()
+        self.assertEqual(cache.get(token_cache_key(self.token.key)), REVOKED)
+        response = self.client.get(reverse('user:user'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_delete_revokes_cached_token(self):
+        self.client.get(reverse('user:user'), headers=self.headers)
+        self.client.delete(reverse('user:user'), headers=self.headers)
+        response = self.client.get(reverse('user:user'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_update_refreshes_cached_user(self):
+        self.client.get(reverse('user:user'), headers=self.headers)
+        data = {'password': 'new_password', 'password2': 'new_password'}
+        self.client.patch(reverse('user:user'), data=data, headers=self.headers)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.get(reverse('user:user'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -3,7 +3,9 @@ from rest_framework.generics import GenericAPIView
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework import status
 from .serializers import UserSerializer
 
@@ -20,6 +22,11 @@ class UserView(GenericAPIView):
             return [AllowAny()]
         return [IsAuthenticated()]
 
+    @property
+    def throttle_scope(self):
+        # registrations hash a password, limit them per address
+        return 'register' if self.request.method == 'POST' else None
+
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -49,10 +56,18 @@ class UserView(GenericAPIView):
         return Response(serializer.data)
 
 
+class LoginView(ObtainAuthToken):
+    # every attempt hashes a password, limit them per address and per username; ObtainAuthToken turns
+    # throttling off
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'login'
+    throttle_username_field = 'username'
+
+
 class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        Token.objects.filter(user=request.user).delete()
+        Token.objects.filter(user_id=request.user.id).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 